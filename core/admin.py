@@ -40,7 +40,7 @@ class ProjectAdmin(ModelAdmin):
     list_filter = ['project_type', 'category', 'is_published', 'created_at', 'updated_at']
     ordering = ['-created_at']
 
-    readonly_fields = ['slug', 'created_at', 'updated_at']
+    readonly_fields = ['slug', 'word_count', 'read_time', 'created_at', 'updated_at']
 
     formfield_overrides = {
         models.TextField: {'widget': WysiwygWidget},
@@ -0,0 +1,26 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from core.database import checkout_seconds, pool_size, pool_available, pool_waiting, pool_wait_seconds
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """The PostgreSQL backend of Django, reporting how long connections take to get (see `core.database`)."""
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            checkout_seconds.observe(time.perf_counter() - start, alias=self.alias)
+            if self.pool is not None:
+                self.record_pool_stats()
+
+    def record_pool_stats(self):
+        # Counters such as the wait time are reset by pop_stats(), so that each checkout adds its share
+        stats = self.pool.pop_stats()
+        pool_size.set(stats.get('pool_size', 0), alias=self.alias)
+        pool_available.set(stats.get('pool_available', 0), alias=self.alias)
+        pool_waiting.set(stats.get('requests_waiting', 0), alias=self.alias)
+        pool_wait_seconds.inc(stats.get('requests_wait_ms', 0) / 1000, alias=self.alias)
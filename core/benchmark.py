@@ -0,0 +1,369 @@
+import socket
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from datetime import timedelta
+from http.client import HTTPException
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.loadtest import percentile, run_load
+from core.utils import request_now, time_since, time_since_many
+
+# Create your benchmarks here.
+# `manage.py benchmark` seeds a throwaway database with VOLUMES rows, then measures every page of `core.urls`:
+# - in process, through the test client: latency, queries and allocated memory of each view;
+# - over HTTP, against a gunicorn process serving the same database: latency and throughput under load.
+# The results can be stored as a baseline, which later runs are compared with.
+# Micro-benchmarks (`--micro`) time hot helpers of the pages on their own, without a database.
+
+VOLUMES = {
+    'projects': 200,
+    'tags': 30,
+    'media': 3,  # per project
+    'achievements': 100,
+    'skills': 20,
+    'stories': 4,  # roots of the tree
+    'substories': 3,  # per story
+    'story_depth': 3,
+}
+
+# Production-like settings, whatever the settings module: views run instead of being served from the page cache,
+# static URLs don't need the collected manifest and development-only middleware is left out
+BENCHMARK_SETTINGS = {
+    'DEBUG': False,
+    'ALLOWED_HOSTS': ['*'],
+    'PAGE_CACHE_ENABLED': False,
+    'REPLICA_DATABASES': [],
+}
+
+# The cover images aren't stored, pages only output their URL
+IMAGE_NAME = 'benchmark/image.png'
+TAGS_PER_ITEM = 3
+
+# Relative margin by which a measure may be worse than the baseline, and the measures compared
+DEFAULT_TOLERANCE = 0.25
+HIGHER_IS_WORSE = ('p95', 'allocations')
+LOWER_IS_WORSE = ('throughput',)
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def benchmark_settings() -> dict:
+    return {
+        **BENCHMARK_SETTINGS,
+        'MIDDLEWARE': [name for name in settings.MIDDLEWARE if name != 'core.middleware.QueryInspectorMiddleware'],
+        'STORAGES': {
+            **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+        },
+    }
+
+
+def seed(volumes=None) -> dict:
+    """
+    Fill the database with generated projects, tags, project media, achievements, skills and a tree of stories.
+    Rows are written in bulk, their rendered content, story paths, related and search indexes computed after.
+
+    Returns:
+        dict: The number of rows created per model.
+    """
+    from core.cache import get_cache
+    from core.models import Project, ProjectMedia, Tag, Achievement, Skill, Story, SearchDocument
+    from core.related import project_index, achievement_index
+    from core.search import rebuild_documents
+    from core.stories import rebuild_paths
+
+    volumes = {**VOLUMES, **(volumes or {})}
+    paragraph = "<p>Benchmark content with <strong>some</strong> markup and a <a href=\"https://example.com\">link</a>.</p>"
+
+    tags = Tag.objects.bulk_create(Tag(name=f'tag {index}') for index in range(volumes['tags']))
+
+    def tagged(items, model):
+        through = model.tags.through
+        field = f'{model._meta.model_name}_id'
+        rows = [
+            through(**{field: item.pk, 'tag_id': tags[(index + offset) % len(tags)].pk})
+            for index, item in enumerate(items) for offset in range(min(TAGS_PER_ITEM, len(tags)))
+        ]
+        through.objects.bulk_create(rows)
+
+    def rendered(items):
+        items = list(items)
+        for item in items:
+            item.render_content()
+        return items
+
+    projects = Project.objects.bulk_create(rendered(
+        Project(title=f'Project {index}', slug=f'project-{index}', description=paragraph * 5, cover_image=IMAGE_NAME)
+        for index in range(volumes['projects'])
+    ))
+    tagged(projects, Project)
+    ProjectMedia.objects.bulk_create(
+        ProjectMedia(project=project, image=IMAGE_NAME, caption=f'Media {index}')
+        for project in projects for index in range(volumes['media'])
+    )
+
+    achievements = Achievement.objects.bulk_create(rendered(
+        Achievement(title=f'Achievement {index}', slug=slugify(f'achievement {index}'), content=paragraph * 2)
+        for index in range(volumes['achievements'])
+    ))
+    tagged(achievements, Achievement)
+    Skill.objects.bulk_create(rendered(
+        Skill(name=f'Skill {index}', description=paragraph) for index in range(volumes['skills'])
+    ))
+
+    level, stories = [None] * volumes['stories'], 0
+    for depth in range(volumes['story_depth']):
+        per_parent = 1 if depth == 0 else volumes['substories']
+        level = Story.objects.bulk_create(rendered(
+            Story(title=f'Story {depth}.{index}', period='2020', content=paragraph * 3, parent=parent)
+            for index, parent in enumerate(parent for parent in level for _ in range(per_parent))
+        ))
+        stories += len(level)
+    rebuild_paths(Story)
+
+    project_index().rebuild()
+    achievement_index().rebuild()
+    rebuild_documents([Project, Achievement, Story], SearchDocument)
+    get_cache().clear()
+    return {
+        'projects': len(projects), 'tags': len(tags), 'media': len(projects) * volumes['media'],
+        'achievements': len(achievements), 'skills': volumes['skills'], 'stories': stories,
+    }
+
+
+def benchmark_urls() -> dict:
+    """Return a URL of every page of `core.urls` by name, e.g. the first project for `project_detail`."""
+    from core.models import Project
+    from core.sitemaps import sitemap_files
+    from core.urls import urlpatterns
+
+    urls = {}
+    for pattern in urlpatterns:
+        name = f'core:{pattern.name}'
+        if pattern.name == 'project_detail':
+            project = Project.objects.filter(is_published=True).order_by('pk').only('pk', 'slug').first()
+            if project is not None:
+                urls[name] = reverse(name, args=[project.pk, project.slug])
+        elif pattern.name == 'sitemap_section':
+            # Only served once the sitemap is split
+            if len(sitemap_files()) > 1:
+                urls[name] = reverse(name, args=[1])
+        elif pattern.name == 'search':
+            urls[name] = f'{reverse(name)}?q=project'
+        else:
+            urls[name] = reverse(name)
+    return urls
+
+
+def fetch(client, url) -> int:
+    """Request a page in full, streamed content included, and return its status."""
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def run_client(urls: dict, requests: int = 50) -> dict:
+    """
+    Request each page `requests` times in turn, in process.
+
+    Returns:
+        dict: Per page name, the `p50`, `p95` and `p99` latencies in milliseconds, the `throughput` in requests
+        per second, the number of `queries` and the peak memory `allocations` in KiB of a request.
+    """
+    client, report = Client(), {}
+    with override_settings(**benchmark_settings()):
+        for name, url in urls.items():
+            # The first request fills the per-process caches, e.g. the availability flag
+            status = fetch(client, url)
+            if status != 200:
+                raise BenchmarkError(f"{url} answered {status}.")
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                fetch(client, url)
+
+            tracemalloc.start()
+            fetch(client, url)
+            allocations = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            latencies, start = [], time.perf_counter()
+            for _ in range(requests):
+                request_start = time.perf_counter()
+                fetch(client, url)
+                latencies.append((time.perf_counter() - request_start) * 1000)
+            elapsed = time.perf_counter() - start
+
+            report[name] = {
+                'p50': round(percentile(latencies, 0.50), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+                'throughput': round(requests / elapsed, 1) if elapsed else 0.0,
+                'queries': len(queries),
+                'allocations': round(allocations / 1024, 1),
+            }
+    return report
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_serving(url: str, process, timeout: float = 30):
+    """Wait until gunicorn answers, its workers having booted, or raise BenchmarkError."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise BenchmarkError(f"gunicorn exited with code {process.returncode}.")
+        try:
+            with urlopen(url, timeout=5):
+                return
+        except (OSError, HTTPException):
+            time.sleep(0.2)
+    raise BenchmarkError(f"gunicorn didn't answer {url} within {timeout} seconds.")
+
+
+def benchmark_application(database_name):
+    """The WSGI application run by gunicorn, serving `database_name` with the benchmark settings."""
+    from django.core.wsgi import get_wsgi_application
+
+    settings.DATABASES['default']['NAME'] = database_name
+    override_settings(**benchmark_settings()).enable()
+    return get_wsgi_application()
+
+
+def run_server(urls: dict, database_name: str, requests: int = 500, concurrency: int = 10, workers: int = 2) -> dict:
+    """
+    Serve `database_name` with gunicorn and load every page with `requests` requests from `concurrency` clients.
+
+    Returns:
+        dict: Per page name, the `p50`, `p95` and `p99` latencies in milliseconds and the `throughput`.
+    """
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', f'core.benchmark:benchmark_application({str(database_name)!r})',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning',
+    ])
+    try:
+        wait_until_serving(f'http://127.0.0.1:{port}{next(iter(urls.values()))}', process)
+        report = {}
+        for name, url in urls.items():
+            # Warm up every worker
+            run_load([f'http://127.0.0.1:{port}{url}'], workers * 2, workers)
+            result = run_load([f'http://127.0.0.1:{port}{url}'], requests, concurrency)['all']
+            if result['errors']:
+                raise BenchmarkError(f"{result['errors']} requests to {url} failed.")
+            report[name] = {key: result[key] for key in ('p50', 'p95', 'p99', 'throughput')}
+        return report
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compare the results of a run with a baseline.
+
+    Returns:
+        list: A line per regression: more queries than the baseline, or a latency, allocation or throughput
+        worse than it by more than `tolerance`. Pages or runs missing on either side are skipped.
+    """
+    regressions = []
+    for run in ('client', 'server'):
+        for name, expected in baseline.get(run, {}).items():
+            actual = report.get(run, {}).get(name)
+            if actual is None:
+                continue
+            if 'queries' in expected and actual['queries'] > expected['queries']:
+                regressions.append(f"{run} {name}: {actual['queries']} queries, {expected['queries']} in the baseline")
+            for measure in HIGHER_IS_WORSE:
+                if measure in expected and actual[measure] > expected[measure] * (1 + tolerance):
+                    regressions.append(f"{run} {name}: {measure} {actual[measure]}, {expected[measure]} in the baseline")
+            for measure in LOWER_IS_WORSE:
+                if measure in expected and actual[measure] < expected[measure] * (1 - tolerance):
+                    regressions.append(f"{run} {name}: {measure} {actual[measure]}, {expected[measure]} in the baseline")
+    return regressions
+
+
+def best_time(function, number: int) -> float:
+    """Return the best time of 5 runs of `function`, per call, in microseconds."""
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def time_since_benchmark(items: int = 1000) -> dict:
+    """Time the relative dates of a long list page, per item, with a clock read per item or per request."""
+    now = timezone.now()
+    dates = [now - timedelta(seconds=index * 7919) for index in range(items)]
+    results = {'time_since, clock read per item': best_time(lambda: [time_since(date) for date in dates], 10) / items}
+    token = request_now.set(now)
+    try:
+        results['time_since, request now'] = best_time(lambda: [time_since(date) for date in dates], 10) / items
+        results['time_since_many'] = best_time(lambda: time_since_many(dates), 10) / items
+    finally:
+        request_now.reset(token)
+    return results
+
+
+COMPONENTS_INCLUDED = """
+{% for tag in tags %}
+    {% include 'components/icons/code.html' with attributes="size-4" %}
+    {% include 'components/icons/time-since.html' with attributes="size-4" %}
+    {% include 'components/tag-chip.html' with label=tag %}
+    {% include 'components/buttons/primary-button.html' with label="Interested to see more..." url="/" %}
+{% endfor %}
+"""
+
+COMPONENTS_COMPILED = """{% load components %}
+{% for tag in tags %}
+    {% icon 'code' 'size-4' %}
+    {% icon 'time-since' 'size-4' %}
+    {% component 'components/tag-chip.html' label=tag %}
+    {% component 'components/buttons/primary-button.html' label="Interested to see more..." url="/" %}
+{% endfor %}
+"""
+
+
+def components_benchmark(items: int = 100) -> dict:
+    """Time the icons, chip and button of a card of the project list, per card, included or precompiled."""
+    from django.template import Context, Engine
+
+    def engine(cached):
+        loaders = ['django.template.loaders.filesystem.Loader']
+        if cached:
+            loaders = [('django.template.loaders.cached.Loader', loaders)]
+        return Engine(dirs=[settings.BASE_DIR / 'templates'], loaders=loaders, libraries={
+            'components': 'core.templatetags.components',
+        })
+
+    context = {'tags': [f'tag <{index}>' for index in range(items)]}
+    results = {}
+    for label, cached in (('uncached loader', False), ('cached loader', True)):
+        for variant, source in (('include', COMPONENTS_INCLUDED), ('component', COMPONENTS_COMPILED)):
+            template = engine(cached).from_string(source)
+            results[f'{variant}, {label}'] = best_time(lambda: template.render(Context(context)), 10) / items
+    return results
+
+
+# Per name, a function returning the microseconds taken by each of its variants
+MICRO_BENCHMARKS = {
+    'time since (per item)': time_since_benchmark,
+    'components (per card)': components_benchmark,
+}
+
+
+def run_micro() -> dict:
+    return {name: benchmark() for name, benchmark in MICRO_BENCHMARKS.items()}
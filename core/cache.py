@@ -0,0 +1,215 @@
+import math
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.instrumentation import record_cache_lookup
+from core.metrics import registry
+from core.models import Update
+from core.routers import primary_reads
+from core.utils import current_now
+
+# Create your cache helpers here.
+
+AVAILABILITY_KEY = 'core:is_available_for_work'
+
+
+def get_cache():
+    """Return the cache backend configured for the site (`SITE_CACHE_ALIAS`, `default` if unset)."""
+    return caches[getattr(settings, 'SITE_CACHE_ALIAS', 'default')]
+
+
+def get_availability() -> dict:
+    """
+    Return the "available for work" flag of the latest `Update` and when it was last changed.
+    Both are held in the site cache, so a page view only queries the database, the primary, after an invalidation.
+
+    Returns:
+        dict: `is_available_for_work` (False if there is no update) and `updated_at` (None if there is no update).
+    """
+    cache = get_cache()
+    availability = cache.get(AVAILABILITY_KEY)
+    record_cache_lookup(availability is not None)
+    if availability is None:
+        with primary_reads():
+            update = Update.objects.values('is_available_for_work', 'updated_at').order_by('pk').last()
+        availability = update or {'is_available_for_work': False, 'updated_at': None}
+        cache.set(AVAILABILITY_KEY, availability, getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', None))
+    return availability
+
+
+def get_is_available_for_work() -> bool:
+    """Return whether the user is available for work, according to the latest `Update`."""
+    return get_availability()['is_available_for_work']
+
+
+def invalidate_availability():
+    """Drop the cached availability so the next page view reloads it."""
+    get_cache().delete(AVAILABILITY_KEY)
+
+
+# Page cache
+# Rendered public pages, and other values built from the database, are stored with the version of every
+# dependency they were rendered from, e.g. `project:12` or `projects`. Bumping a dependency when its rows
+# change makes exactly the pages built from them stale; the others keep being served from the cache.
+
+PAGE_KEY = 'core:page:{host}:{path}:{params}'
+DEPENDENCY_KEY = 'core:dependency:{}'
+
+page_cache_requests = registry.counter(
+    'jolio_page_cache_requests_total', 'Page cache lookups by view and result.', ['view', 'result']
+)
+
+
+def get_page_cache_key(request, params=()) -> str:
+    """
+    Build the cache key of a page from its host, path and the values of the query parameters it depends on.
+
+    Args:
+        request (HttpRequest): The request for the page.
+        params (Iterable[str]): The query parameters that select the content, e.g. `page`.
+
+    Returns:
+        str: The cache key.
+    """
+    values = '&'.join(f'{param}={request.GET.get(param, "")}' for param in params)
+    return PAGE_KEY.format(host=request.get_host(), path=request.path, params=values)
+
+
+def get_versioned(key):
+    """
+    Return the value stored under `key` by `set_versioned()`, or None if it is missing or one of its dependencies changed.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        versions = cache.get_many([DEPENDENCY_KEY.format(name) for name in entry['dependencies']])
+        if any(versions.get(DEPENDENCY_KEY.format(name)) != version for name, version in entry['dependencies'].items()):
+            entry = None
+    record_cache_lookup(entry is not None)
+    return entry['value'] if entry is not None else None
+
+
+def set_versioned(key, value, dependencies, timeout=None):
+    """
+    Store a value under `key` along with the current version of each of its dependencies.
+
+    Args:
+        key (str): The cache key.
+        value: The value to cache.
+        dependencies (Iterable[str]): The names of the dependencies the value was built from.
+        timeout (int): The cache timeout in seconds, None to keep it until it is evicted.
+    """
+    cache = get_cache()
+    dependency_keys = {DEPENDENCY_KEY.format(name): name for name in set(dependencies)}
+    versions = cache.get_many(dependency_keys)
+    missing = {dependency_key: uuid4().hex for dependency_key in dependency_keys if dependency_key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    cache.set(key, {
+        'value': value,
+        'dependencies': {name: versions[dependency_key] for dependency_key, name in dependency_keys.items()},
+    }, timeout)
+
+
+def get_cached_page(key):
+    """
+    Return the cached page stored under `key`, or None if it is missing, one of its dependencies changed
+    or one of the relative times it shows, e.g. "Just now", doesn't hold anymore.
+
+    Returns:
+        dict | None: The cached `content` and `headers` of the page.
+    """
+    page = get_versioned(key)
+    if page is not None and page.get('changes_at') is not None and current_now() >= page['changes_at']:
+        return None
+    return page
+
+
+def set_cached_page(key, response, dependencies, changes_at=None):
+    """
+    Store a rendered response under `key` along with the current version of each of its dependencies.
+
+    Args:
+        key (str): The page cache key.
+        response (HttpResponse): The rendered response.
+        dependencies (Iterable[str]): The names of the dependencies the page was rendered from.
+        changes_at (datetime): When the first relative time the page shows changes, to keep it until then only.
+    """
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', None)
+    if changes_at is not None:
+        remaining = math.ceil((changes_at - current_now()).total_seconds())
+        if remaining <= 0:
+            return
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    set_versioned(key, {
+        'content': response.content,
+        'headers': {name: value for name, value in response.items() if name.lower() != 'content-length'},
+        'changes_at': changes_at,
+    }, dependencies, timeout)
+
+
+def get_dependency_versions(*dependencies) -> list:
+    """Return the current version of each dependency, None for those no page was cached against yet."""
+    versions = get_cache().get_many([DEPENDENCY_KEY.format(name) for name in dependencies])
+    return [versions.get(DEPENDENCY_KEY.format(name)) for name in dependencies]
+
+
+def invalidate_pages(*dependencies):
+    """Make every cached page rendered from one of `dependencies` stale."""
+    get_cache().set_many({DEPENDENCY_KEY.format(name): uuid4().hex for name in dependencies}, None)
+
+
+# Relative times
+# Pages show relative times, e.g. "5 minutes ago", which change without any row changing. When a page is rendered,
+# since when its relative times read as they do is recorded along with when the first of them changes (see
+# `core.utils.TimeSinceChanges`), so that the validators of `ConditionalGetMixin` only change when the text does.
+
+RELATIVE_TIMES_KEY = 'core:relative-times:{}'
+
+
+def get_relative_times_since(key, values):
+    """
+    Return since when the relative times of a page read as they were last rendered.
+
+    Args:
+        key (str): The key of the page, e.g. a digest of its view and URL.
+        values (list): The validator values the page is rendered from.
+
+    Returns:
+        datetime | None: None if the page wasn't rendered from the same `values`, or one of its relative times changed.
+    """
+    entry = get_cache().get(RELATIVE_TIMES_KEY.format(key))
+    record_cache_lookup(entry is not None)
+    if entry is None or entry['values'] != values:
+        return None
+    if entry['changes_at'] is not None and current_now() >= entry['changes_at']:
+        return None
+    return entry['since']
+
+
+def set_relative_times(key, values, changes_at, since=None):
+    """
+    Record the relative times of a page that was just rendered, until the first of them changes.
+
+    Args:
+        key (str): The key of the page.
+        values (list): The validator values the page was rendered from.
+        changes_at (datetime): When the first relative time the page shows changes, None if it shows none.
+        since (datetime): What `get_relative_times_since()` returned before rendering, kept while it holds.
+
+    Returns:
+        datetime: Since when they read as they do, now unless `since` is given.
+    """
+    since = since or current_now()
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', None)
+    if changes_at is not None:
+        remaining = max(math.ceil((changes_at - current_now()).total_seconds()), 1)
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    get_cache().set(
+        RELATIVE_TIMES_KEY.format(key), {'since': since, 'changes_at': changes_at, 'values': values}, timeout
+    )
+    return since
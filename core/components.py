@@ -0,0 +1,56 @@
+import re
+from functools import lru_cache
+
+from django.dispatch import receiver
+from django.template.loader import get_template
+from django.utils.autoreload import file_changed
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+# Create your components here.
+# The icons, chips and buttons of `templates/components/` are static markup with a few `{{ variable }}` holes,
+# e.g. the classes of an icon or the label of a chip, and are repeated on every card of the lists.
+# Instead of an `{% include %}`, which looks the template up and renders it node by node each time,
+# a component is rendered once with a marker in place of each value and kept as a list of fragments;
+# using it only joins the fragments with the escaped values.
+# Components therefore can't branch on their values: no `{% if %}`, `{% for %}` or filters applied to them.
+
+ICONS_DIR = 'components/icons'
+
+MARKER = '\x1f{}\x1f'
+MARKER_PATTERN = re.compile('\x1f([^\x1f]+)\x1f')
+
+
+@lru_cache(maxsize=None)
+def compile_component(template_name: str, names: tuple) -> tuple:
+    """
+    Render a component with a marker in place of each of `names`.
+
+    Returns:
+        tuple: Alternately literal markup and the name of a value, starting and ending with markup.
+    """
+    html = get_template(template_name).render({name: mark_safe(MARKER.format(name)) for name in names})
+    return tuple(MARKER_PATTERN.split(html))
+
+
+def render_component(template_name: str, **values) -> str:
+    """
+    Render a component with `values`, the way `{% include template_name with ... %}` would.
+    Missing variables render as an empty string and values are escaped unless marked safe.
+    """
+    fragments = compile_component(template_name, tuple(sorted(values)))
+    return mark_safe(''.join(
+        fragment if index % 2 == 0 else conditional_escape(values[fragment])
+        for index, fragment in enumerate(fragments)
+    ))
+
+
+def render_icon(name: str, attributes: str = '') -> str:
+    """Render `components/icons/<name>.html` with `attributes` as the classes of its <svg>."""
+    return render_component(f'{ICONS_DIR}/{name}.html', attributes=attributes)
+
+
+@receiver(file_changed)
+def clear_components(sender, file_path, **kwargs):
+    # The development server reloads templates without restarting, so edited components are compiled again
+    compile_component.cache_clear()
@@ -0,0 +1,38 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+
+# Create your concurrency helpers here.
+# The context of a view is read by independent queries (see `CommonContextMixin.get_context_queries()`):
+# querysets, and callables for reads the ORM can't express lazily, e.g. cache lookups or a tree of stories.
+# Sync views evaluate them in turn. Async views evaluate the querysets with the async ORM of Django and run
+# the callables with `sync_to_async()`, all at the same time. Django 5.2 still runs the queries of the async
+# ORM one after the other on the thread of the request, so they only overlap the other reads for now.
+
+
+def evaluate(query):
+    """Return the value of a context query: the list of objects of a queryset, or what a callable returns."""
+    if isinstance(query, QuerySet):
+        return list(query)
+    return query()
+
+
+async def aevaluate(query):
+    """Async version of `evaluate()`, reading querysets with the async ORM."""
+    if isinstance(query, QuerySet):
+        return [item async for item in query]
+    return await sync_to_async(query)()
+
+
+async def concurrently(*queries) -> list:
+    """
+    Evaluate context queries at the same time and return their values, in order.
+
+    Args:
+        *queries (QuerySet | callable): The queries, e.g. `Skill.objects.all()` or `get_is_available_for_work`.
+
+    Returns:
+        list: The value of each query (see `evaluate()`).
+    """
+    return list(await asyncio.gather(*(aevaluate(query) for query in queries)))
@@ -0,0 +1,257 @@
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from core.images import RENDITION_FORMATS
+from core.utils import html_to_text, excerpt
+
+# Create your content pipeline here.
+# Rich text fields are edited with the WYSIWYG widget of the admin. On save their HTML goes through
+# `render_content()` once: it is sanitized against an allowlist, its images are made lazy and, when they
+# are uploads with renditions, responsive, and a plain-text excerpt is cut from it. The renditions are read
+# from the rows the images were uploaded to, so rendering makes no storage request. Both results are stored
+# next to the source field (e.g. `description_html` and `excerpt`), so templates only output strings.
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'ins', 'kbd', 'li', 'mark', 'ol', 'p', 'pre',
+    's', 'small', 'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead',
+    'tr', 'u', 'ul',
+}
+
+ALLOWED_ATTRIBUTES = {
+    '*': {'title'},
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+}
+
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto', 'tel'}
+
+# Tags dropped together with everything inside them
+DROPPED_TAGS = {
+    'script', 'style', 'template', 'iframe', 'object', 'embed', 'noscript', 'svg', 'math', 'textarea', 'select',
+}
+
+VOID_TAGS = {'br', 'hr', 'img'}
+
+# Layout width assumed for images in rich text, for the browser to pick a rendition
+CONTENT_IMAGE_SIZES = '(min-width: 1024px) 50vw, 100vw'
+
+EXCERPT_LENGTH = 300
+
+
+def is_safe_url(url: str) -> bool:
+    # Browsers ignore control characters and whitespace in schemes, e.g. `java\nscript:`
+    cleaned = ''.join(char for char in url if char.isprintable() and not char.isspace())
+    try:
+        return urlsplit(cleaned).scheme.lower() in ALLOWED_SCHEMES
+    except ValueError:
+        return False
+
+
+def storage_name(src: str):
+    """Return the name in the default storage of an uploaded file from its URL, or None if it is not one."""
+    prefix = urlsplit(default_storage.url('_')).path[:-1]
+    path = urlsplit(src).path
+    if not path.startswith(prefix) or path == prefix:
+        return None
+    return unquote(path[len(prefix):])
+
+
+def find_renditions(names) -> dict:
+    """
+    Return the renditions of uploaded images by storage name, each the rendition names per width, per format.
+    They are read from the `<field>_renditions` column of the rows the images were uploaded to, a query per
+    image field, rather than asked from the storage for every width and format.
+    """
+    from core.signals import IMAGE_FIELDS
+
+    names, found = set(names), {}
+    for model, field_names in IMAGE_FIELDS.items():
+        for field_name in field_names:
+            if not names - found.keys():
+                return found
+            rows = model._default_manager.filter(**{f'{field_name}__in': names - found.keys()}).values_list(
+                field_name, f'{field_name}_renditions'
+            )
+            for name, renditions in rows:
+                if renditions and renditions.get('source') == name and renditions.get('formats'):
+                    found[name] = renditions['formats']
+    return found
+
+
+def format_attributes(attributes: dict) -> str:
+    return ''.join(f' {name}="{escape(str(value))}"' for name, value in attributes.items())
+
+
+def render_image(attributes: dict, formats: dict) -> str:
+    """Render a content image lazily, as a <picture> offering its renditions `formats` if it has some."""
+    img = f"<img{format_attributes({**attributes, 'loading': 'lazy', 'decoding': 'async'})}>"
+    if not formats:
+        return img
+
+    sources = ''.join(
+        '<source{}>'.format(format_attributes({
+            'type': options['mime'],
+            'srcset': ', '.join(
+                f'{default_storage.url(rendition)} {width}w'
+                for width, rendition in sorted(formats[fmt].items(), key=lambda item: int(item[0]))
+            ),
+            'sizes': CONTENT_IMAGE_SIZES,
+        }))
+        for fmt, options in RENDITION_FORMATS.items() if formats.get(fmt)
+    )
+    # display: contents keeps the <img> laid out as if it were a direct child of the parent
+    return f'<picture style="display: contents">{sources}{img}</picture>'
+
+
+class Sanitizer(HTMLParser):
+    """
+    Rebuild HTML from the allowed tags and attributes only, escaping all text, dropping comments
+    and closing the tags left open.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.dropping = []
+        # Index in `parts` and attributes of each image, rendered once their renditions are read together
+        self.images = []
+
+    def clean_attributes(self, tag, attrs) -> dict:
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        attributes = {}
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            attributes[name] = value
+        if tag == 'a' and attributes.get('target') == '_blank':
+            attributes['rel'] = 'noopener noreferrer'
+        return attributes
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            if tag in DROPPED_TAGS:
+                self.dropping.append(tag)
+            return
+        if tag in DROPPED_TAGS:
+            self.dropping.append(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+
+        attributes = self.clean_attributes(tag, attrs)
+        if tag == 'img':
+            if attributes.get('src'):
+                self.images.append((len(self.parts), attributes))
+                self.parts.append('')
+            return
+        self.parts.append(f'<{tag}{format_attributes(attributes)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag == self.dropping[-1]:
+                self.dropping.pop()
+            return
+        if tag not in self.open_tags:
+            return
+        # Close the tags left open inside it too
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        self.parts.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        self.open_tags = []
+
+        names = {index: storage_name(attributes['src']) for index, attributes in self.images}
+        renditions = find_renditions({name for name in names.values() if name}) if any(names.values()) else {}
+        for index, attributes in self.images:
+            self.parts[index] = render_image(attributes, renditions.get(names[index], {}))
+        self.images = []
+
+
+def sanitize_html(html: str) -> str:
+    """
+    Keep only the allowed tags and attributes of an HTML fragment, with lazy-loading images.
+
+    Args:
+        html (str): The HTML content, as produced by the WYSIWYG editor.
+
+    Returns:
+        str: The sanitized HTML, safe to output as is.
+    """
+    if not html:
+        return ''
+    sanitizer = Sanitizer()
+    sanitizer.feed(html)
+    sanitizer.close()
+    return ''.join(sanitizer.parts).strip()
+
+
+def render_content(html: str, length: int = EXCERPT_LENGTH) -> tuple:
+    """
+    Render rich text for output: its sanitized HTML and a plain-text excerpt of it.
+
+    Args:
+        html (str): The HTML content, as produced by the WYSIWYG editor.
+        length (int): The maximum number of characters of the excerpt.
+
+    Returns:
+        tuple: The sanitized HTML and the excerpt.
+    """
+    sanitized = sanitize_html(html)
+    return sanitized, excerpt(html_to_text(sanitized), length)
+
+
+def rebuild_rendered_content(model, batch_size: int = 500) -> list:
+    """
+    Render again the rich text of every row of a model, e.g. after the allowlist changed, through the
+    `render_content()` of the model, and bump `updated_at` for the validators, sitemap and feeds.
+
+    Args:
+        model (Model): A model rendering its rich text on save, e.g. `Project`.
+        batch_size (int): Number of rows loaded and written per query.
+
+    Returns:
+        list: The primary keys of the rows rendered.
+    """
+    fields = [*model.RENDERED_FIELDS, 'updated_at']
+    queryset = model._default_manager.only('pk', model.CONTENT_FIELD).order_by('pk')
+    batch, pks, now = [], [], timezone.now()
+    for instance in queryset.iterator(chunk_size=batch_size):
+        instance.render_content()
+        # Bulk writes skip auto_now
+        instance.updated_at = now
+        batch.append(instance)
+        pks.append(instance.pk)
+        if len(batch) >= batch_size:
+            model._default_manager.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        model._default_manager.bulk_update(batch, fields)
+    return pks
@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import json
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+try:
+    import brotli
+except ImportError:  # optional, only the .gz siblings are written without it
+    brotli = None
+
+# Create your static export here.
+# The public pages only change when the admin edits something, so they can be served as plain files.
+# `export_pages()` renders each of them through the real URL conf, middleware and views, with a test client,
+# and stores the HTML with precompressed `.gz` (and `.br`) siblings, e.g. `dids/page/2/index.html`.
+# A manifest keeps the state of the rows every page is rendered from: the validator values of its view (see
+# `ConditionalGetMixin`) and the row counts of the tables. An incremental export only renders the pages whose
+# state changed; the relative times of the others, e.g. "5 minutes ago", are refreshed by a full export.
+
+MANIFEST_NAME = 'export-manifest.json'
+
+# Settings the pages are rendered with: any host, as nothing leaves the process, and page numbers,
+# which map to files, rather than cursors
+EXPORT_SETTINGS = {'ALLOWED_HOSTS': ['*'], 'CURSOR_PAGINATION': False}
+
+
+class ExportError(Exception):
+    pass
+
+
+@dataclass
+class ExportedPage:
+    url: str
+    path: str
+    status: int
+    content: bytes = b''
+
+
+def paginated_urls(name, view, queryset) -> list:
+    """Return the URL of every page of a list view, `?page=2` onwards being query strings."""
+    url = reverse(name)
+    pages = max(math.ceil(queryset.count() / view.paginate_by), 1)
+    return [url] + [f'{url}?page={page}' for page in range(2, pages + 1)]
+
+
+def public_urls() -> list:
+    """Return the URL of every public page: home, every page of the lists, every project and the about page."""
+    from core.models import Project, Achievement
+    from core.views import ProjectsView, AchievementsView
+
+    return [
+        reverse('core:home'),
+        *paginated_urls('core:projects', ProjectsView, Project.objects.filter(is_published=True)),
+        *(reverse('core:project_detail', args=[pk, slug])
+          for pk, slug in Project.objects.filter(is_published=True).order_by('pk').values_list('pk', 'slug')),
+        *paginated_urls('core:achievements', AchievementsView, Achievement.objects.filter(is_published=True)),
+        reverse('core:about'),
+    ]
+
+
+def export_path(url: str) -> str:
+    """Return the file a page is stored in, e.g. `/dids/?page=2` -> `dids/page/2/index.html`."""
+    path, _, query = url.partition('?')
+    path = path.strip('/')
+    match = re.fullmatch(r'page=(\d+)', query)
+    if match:
+        path = f'{path}/page/{match.group(1)}'
+    return f'{path}/index.html' if path else 'index.html'
+
+
+def rewrite_page_links(html: str, url: str) -> str:
+    """
+    Point the links to the pages of a list, e.g. `?page=2` or the canonical `https://host/dids/?page=2`,
+    to their exported files.
+    """
+    base = url.partition('?')[0]
+    pattern = re.compile(rf'href="((?:https?://[^/"]+)?{re.escape(base)})?\?page=(\d+)"')
+
+    def replace(match):
+        target = (match.group(1) or '').removesuffix(base) + base
+        return f'href="{target}"' if match.group(2) == '1' else f'href="{target}page/{match.group(2)}/"'
+    return pattern.sub(replace, html)
+
+
+def site_host() -> str:
+    # Absolute URLs, e.g. the canonical link, point to the site rather than to the test client
+    return urlsplit(getattr(settings, 'SITE_URL', None) or '').netloc or 'localhost'
+
+
+def table_counts() -> list:
+    """Return the row count of every table the public pages show, which deletions change."""
+    from core.models import Project, Achievement, Skill, Story, Tag
+
+    return [model.objects.count() for model in (Project, Achievement, Skill, Story, Tag)]
+
+
+def page_state(url: str, counts: list) -> str:
+    """
+    Return a digest of the state of the rows a page is rendered from, or '' if its view can't tell,
+    e.g. for a missing project.
+
+    Args:
+        url (str): The URL of the page.
+        counts (list): The `table_counts()` of the export.
+    """
+    match = resolve(url.partition('?')[0])
+    view = match.func.view_class(**match.func.view_initkwargs)
+    with override_settings(**EXPORT_SETTINGS):
+        view.setup(RequestFactory().get(url, secure=True, HTTP_HOST=site_host()), *match.args, **match.kwargs)
+        values = view.get_validator_values()
+    if values is None:
+        return ''
+    return hashlib.sha256(repr([url, values, counts]).encode()).hexdigest()
+
+
+def render_page(url: str) -> ExportedPage:
+    """Render a page through the URL conf, the middleware and its view."""
+    with override_settings(**EXPORT_SETTINGS):
+        response = Client().get(url, secure=True, HTTP_HOST=site_host())
+    page = ExportedPage(url, export_path(url), response.status_code)
+    if response.status_code == 200:
+        page.content = rewrite_page_links(response.content.decode(response.charset), url).encode()
+    return page
+
+
+def compress(content: bytes) -> dict:
+    """Return the precompressed variants of a file, by extension."""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+def write_file(storage, name: str, content: bytes):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def read_manifest(storage) -> dict:
+    if not storage.exists(MANIFEST_NAME):
+        return {}
+    with storage.open(MANIFEST_NAME) as file:
+        return json.load(file).get('pages', {})
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def export_pages(storage, incremental=False, workers=1, log=lambda message: None) -> dict:
+    """
+    Render every public page to `storage`, with its compressed siblings and the manifest.
+
+    Args:
+        storage (Storage): Where the files are written, e.g. a `FileSystemStorage` or the S3 storage.
+        incremental (bool): Only render the pages whose rows changed since the last export.
+        workers (int): The number of processes rendering pages; 1 renders in this process.
+        log (callable): Called with a line per page written or removed.
+
+    Returns:
+        dict: The number of pages `rendered`, `unchanged` and `removed`.
+
+    Raises:
+        ExportError: If a page does not render.
+    """
+    previous = read_manifest(storage) if incremental else {}
+    urls = public_urls()
+    tables = table_counts()
+    states = {url: page_state(url, tables) for url in urls}
+
+    manifest, counts = {}, {'rendered': 0, 'unchanged': 0, 'removed': 0}
+    stale = []
+    for url in urls:
+        entry = previous.get(url)
+        if entry is not None and states[url] and entry.get('state') == states[url]:
+            manifest[url] = entry
+            counts['unchanged'] += 1
+        else:
+            stale.append(url)
+
+    if workers > 1 and len(stale) > 1:
+        # Forked workers must not share the connections of this process
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            pages = list(executor.map(render_page, stale, chunksize=4))
+    else:
+        pages = list(map(render_page, stale))
+
+    for page in pages:
+        if page.status != 200:
+            raise ExportError(f"{page.url} answered {page.status}.")
+
+        entry = {'path': page.path, 'state': states[page.url], 'sha256': hashlib.sha256(page.content).hexdigest()}
+        manifest[page.url] = entry
+        # e.g. the page of a project whose edit was reverted
+        if previous.get(page.url, {}).get('sha256') == entry['sha256']:
+            counts['unchanged'] += 1
+            continue
+
+        write_file(storage, page.path, page.content)
+        for extension, content in compress(page.content).items():
+            write_file(storage, page.path + extension, content)
+        counts['rendered'] += 1
+        log(f"rendered {page.url} -> {page.path}")
+
+    # Pages that are gone, e.g. an unpublished project or a list that got shorter
+    paths = {entry['path'] for entry in manifest.values()}
+    for url, entry in previous.items():
+        if url not in manifest and entry['path'] not in paths:
+            for name in (entry['path'], entry['path'] + '.gz', entry['path'] + '.br'):
+                if storage.exists(name):
+                    storage.delete(name)
+            counts['removed'] += 1
+            log(f"removed {url} ({entry['path']})")
+
+    write_file(storage, MANIFEST_NAME, json.dumps({'pages': manifest}, indent=2, sort_keys=True).encode())
+    return counts
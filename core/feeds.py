@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from core.cache import get_page_cache_key, get_cached_page, set_cached_page
+from core.models import Project, Achievement
+from core.routers import read_from_primary
+
+# Create your feeds here.
+# RSS and Atom feeds of the latest projects and achievements. Their items show the stored excerpts,
+# and the rendered feeds are kept in the page cache until a row of their table changes, rendered from the primary.
+
+FEED_ITEMS = 20
+
+
+class CachedFeed(Feed):
+    """A feed served from the page cache, rendered again once one of `dependencies` is bumped."""
+    dependencies = ()
+
+    def __call__(self, request, *args, **kwargs):
+        if not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+            return super().__call__(request, *args, **kwargs)
+
+        key = get_page_cache_key(request)
+        page = get_cached_page(key)
+        if page is not None:
+            response = HttpResponse(page['content'])
+            for name, value in page['headers'].items():
+                response[name] = value
+            return response
+
+        read_from_primary()
+        response = super().__call__(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_cached_page(key, response, self.dependencies)
+        return response
+
+
+class ProjectsFeed(CachedFeed):
+    title = "Joel Fah — Projects"
+    description = "The latest things I designed and built."
+    dependencies = ('project-lastmod',)
+
+    def link(self):
+        return reverse('core:projects')
+
+    def items(self):
+        return Project.objects.filter(is_published=True).only(
+            'id', 'slug', 'title', 'excerpt', 'created_at', 'updated_at'
+        ).order_by('-created_at')[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_link(self, item):
+        return reverse('core:project_detail', args=[item.pk, item.slug])
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class AtomProjectsFeed(ProjectsFeed):
+    feed_type = Atom1Feed
+    subtitle = ProjectsFeed.description
+
+
+class AchievementsFeed(CachedFeed):
+    title = "Joel Fah — Achievements"
+    description = "The latest milestones, awards and things worth bragging about."
+    dependencies = ('achievement-lastmod',)
+
+    def link(self):
+        return reverse('core:achievements')
+
+    def items(self):
+        return Achievement.objects.filter(is_published=True).only(
+            'id', 'title', 'excerpt', 'created_at', 'updated_at'
+        ).order_by('-created_at', '-event_date')[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_link(self, item):
+        return f"{reverse('core:achievements')}#achievement-{item.pk}"
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class AtomAchievementsFeed(AchievementsFeed):
+    feed_type = Atom1Feed
+    subtitle = AchievementsFeed.description
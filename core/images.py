@@ -0,0 +1,191 @@
+import base64
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Create your image helpers here.
+# Renditions are resized copies of an uploaded image, stored next to it in the same storage,
+# e.g. `projects/covers/app.jpg` -> `projects/covers/app.640w.webp`. Their names are kept in the
+# `<field>_renditions` JSON column of the model so that templates can build a `srcset` without touching storage.
+# The same pass stores the intrinsic size of the image and a tiny inline placeholder (LQIP) in
+# `<field>_width`, `<field>_height` and `<field>_placeholder`, so pages can reserve the layout space
+# and paint something before the image arrives.
+
+DEFAULT_RENDITION_WIDTHS = (320, 640, 960, 1280, 1920)
+
+# Preferred first: browsers pick the first <source> whose type they support
+RENDITION_FORMATS = {
+    'avif': {'mime': 'image/avif', 'pillow': 'AVIF', 'options': {'quality': 60}},
+    'webp': {'mime': 'image/webp', 'pillow': 'WEBP', 'options': {'quality': 80, 'method': 6}},
+}
+
+
+# Width of the low-quality image placeholder, blown up and smoothed by the browser
+PLACEHOLDER_WIDTH = 16
+
+
+def rendition_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_RENDITION_WIDTHS', DEFAULT_RENDITION_WIDTHS)))
+
+
+def rendition_formats():
+    """Return the rendition formats enabled in settings that the installed Pillow can encode."""
+    formats = getattr(settings, 'IMAGE_RENDITION_FORMATS', tuple(RENDITION_FORMATS))
+    return [fmt for fmt in formats if fmt in RENDITION_FORMATS and features.check(fmt)]
+
+
+def rendition_name(name: str, width: int, fmt: str) -> str:
+    """
+    Return the storage name of a rendition of the image stored under `name`.
+
+    Args:
+        name (str): The storage name of the original image, e.g. `projects/covers/app.jpg`.
+        width (int): The width of the rendition in pixels.
+        fmt (str): The format of the rendition, e.g. `webp`.
+
+    Returns:
+        str: The storage name of the rendition, e.g. `projects/covers/app.640w.webp`.
+    """
+    root, _ = posixpath.splitext(name)
+    return f'{root}.{width}w.{fmt}'
+
+
+def webp_name(name: str) -> str:
+    """Return the name of the WebP version of a static image, e.g. `core/images/pfp.jpg` -> `core/images/pfp.webp`."""
+    root, _ = posixpath.splitext(name)
+    return f'{root}.webp'
+
+
+def open_image(field_file):
+    """Open an image field file from its storage, with its EXIF orientation applied."""
+    with field_file.storage.open(field_file.name, 'rb') as file:
+        image = Image.open(file)
+        image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def generate_renditions(field_file, image=None) -> dict:
+    """
+    Resize an uploaded image to each rendition width smaller than it, in each rendition format,
+    and store the results next to it.
+
+    Args:
+        field_file (ImageFieldFile): The uploaded image.
+        image (Image): The opened image, to avoid reading it from storage again.
+
+    Returns:
+        dict: The `source` name the renditions were made from and, per format, the rendition name per width.
+    """
+    image = image or open_image(field_file)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    widths = [width for width in rendition_widths() if width < image.width] or [image.width]
+    renditions = {'source': field_file.name, 'formats': {}}
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in rendition_formats():
+            buffer = BytesIO()
+            resized.save(buffer, RENDITION_FORMATS[fmt]['pillow'], **RENDITION_FORMATS[fmt]['options'])
+            name = rendition_name(field_file.name, width, fmt)
+            if field_file.storage.exists(name):
+                field_file.storage.delete(name)
+            name = field_file.storage.save(name, ContentFile(buffer.getvalue()))
+            renditions['formats'].setdefault(fmt, {})[str(width)] = name
+    return renditions
+
+
+def generate_placeholder(image) -> str:
+    """
+    Shrink an image to a few pixels wide and encode it as an inline data URI.
+
+    Args:
+        image (Image): The opened image.
+
+    Returns:
+        str: The `data:` URI of the placeholder, a few hundred bytes long.
+    """
+    placeholder = image.convert('RGB')
+    placeholder.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH), Image.Resampling.BOX)
+    buffer = BytesIO()
+    if features.check('webp'):
+        placeholder.save(buffer, 'WEBP', quality=40)
+        mime = 'image/webp'
+    else:
+        placeholder.save(buffer, 'PNG', optimize=True)
+        mime = 'image/png'
+    return f'data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode()}'
+
+
+def rendition_names(renditions: dict) -> set:
+    """Return the storage names of the renditions listed by a `<field>_renditions` value."""
+    return {name for names in renditions.get('formats', {}).values() for name in names.values()}
+
+
+def delete_renditions(storage, renditions: dict, keep=()):
+    """Delete the renditions listed by a `<field>_renditions` value from storage, except the names in `keep`."""
+    for name in rendition_names(renditions) - set(keep):
+        storage.delete(name)
+
+
+def get_renditions(field_file) -> dict:
+    """Return the renditions stored for an image field file, or an empty dict if they are missing or outdated."""
+    renditions = getattr(field_file.instance, f'{field_file.field.name}_renditions', None) or {}
+    return renditions if renditions.get('source') == field_file.name else {}
+
+
+def process_image(model_label: str, pk: int, field_name: str):
+    """
+    Generate the renditions, intrinsic size and placeholder of an image field of a saved row and store them on it.
+    Takes only serializable arguments, to be run by `core.tasks.enqueue()` or any task queue.
+
+    Args:
+        model_label (str): The label of the model, e.g. `core.Project`.
+        pk (int): The primary key of the row.
+        field_name (str): The name of the image field, e.g. `cover_image`.
+
+    Returns:
+        bool: False if the image could not be read or resized, which is logged, True otherwise.
+    """
+    from django.apps import apps
+    from django.db import transaction
+    from core.signals import invalidate_instance_pages
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    field_file = getattr(instance, field_name, None)
+    if not field_file:
+        return True
+    previous = getattr(instance, f'{field_name}_renditions', None) or {}
+
+    try:
+        image = open_image(field_file)
+        values = {
+            f'{field_name}_width': image.width,
+            f'{field_name}_height': image.height,
+            f'{field_name}_placeholder': generate_placeholder(image),
+            f'{field_name}_renditions': generate_renditions(field_file, image),
+        }
+    except (OSError, ValueError):
+        logger.exception("Could not process the image %s", field_file.name)
+        return False
+
+    # Only store them if the image was not replaced in the meantime, without bumping updated_at
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**values)
+    renditions = values[f'{field_name}_renditions']
+    if updated:
+        invalidate_instance_pages(instance)
+        # The renditions of the image it replaced, once the row lists the new ones
+        transaction.on_commit(lambda: delete_renditions(
+            field_file.storage, previous, keep=rendition_names(renditions)
+        ))
+    else:
+        delete_renditions(field_file.storage, renditions)
+    return True
@@ -0,0 +1,93 @@
+import time
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.metrics import registry
+
+# Create your request instrumentation here.
+# `core.middleware.PerformanceMiddleware` keeps the timings of the request being served in `request_stats`;
+# code anywhere in the request adds to them, e.g. the cache helpers record their hits and misses.
+# Every database connection times its queries into the stats of the request running them, on whichever thread
+# they run: the thread of a sync request, or the one Django gives an async request for its ORM queries.
+# Recording is a context variable lookup and a few additions, cheap enough to leave on in production.
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+request_duration = registry.histogram(
+    'jolio_request_duration_seconds', 'Time taken to answer requests, by view.', ['view']
+)
+request_queries = registry.histogram(
+    'jolio_request_queries', 'Database queries run per request, by view.', ['view'], buckets=QUERY_BUCKETS
+)
+request_db_duration = registry.histogram(
+    'jolio_request_db_seconds', 'Time spent in database queries per request, by view.', ['view']
+)
+request_render_duration = registry.histogram(
+    'jolio_request_render_seconds', 'Time spent rendering templates per request, by view.', ['view']
+)
+request_cache_lookups = registry.counter(
+    'jolio_request_cache_lookups_total', 'Site cache lookups made by requests, by view and result.', ['view', 'result']
+)
+
+request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """The timings of a request, in seconds."""
+    __slots__ = ('start', 'queries', 'db', 'render_start', 'render', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render_start = None
+        self.render = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        """Time a query of the request (see `record_query()`)."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, total) -> str:
+        """Return the `Server-Timing` header of the request, durations being in milliseconds."""
+        metrics = [
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'render;dur={self.render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        if self.cache_hits or self.cache_misses:
+            metrics.append(f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"')
+        return ', '.join(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    """An execute wrapper (see `connection.execute_wrapper()`) timing the queries of the current request, if any."""
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # First, so that the wrappers added and removed by `connection.execute_wrapper()` meanwhile are left in place
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def record_cache_lookup(hit: bool):
+    """Count a site cache lookup in the stats of the current request, if any."""
+    stats = request_stats.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
@@ -0,0 +1,59 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+# Create your load test here.
+# Requests the public pages of a running server from concurrent threads, as browsers would, and summarizes
+# the latencies; e.g. to compare the WSGI and ASGI deployments of the same database.
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Return the value below which `fraction` of `values` fall (nearest rank), 0 for no values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def fetch(url: str, timeout: float) -> tuple:
+    """Request a page and return its status and latency in seconds, the body being read in full."""
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers={'Accept-Encoding': 'gzip'}), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    return status, time.perf_counter() - start
+
+
+def run_load(urls: list, requests: int, concurrency: int, timeout: float = 30) -> dict:
+    """
+    Request `urls` in turn, `requests` times in total, from `concurrency` threads.
+
+    Returns:
+        dict: Per URL and for `all` of them, the number of `requests` and `errors`, the `throughput`
+        in requests per second and the `p50`, `p95` and `p99` latencies in milliseconds.
+    """
+    targets = [urls[index % len(urls)] for index in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: fetch(url, timeout), targets))
+    elapsed = time.perf_counter() - start
+
+    def summarize(samples):
+        latencies = [latency * 1000 for _, latency in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for status, _ in samples if status >= 400),
+            'throughput': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+            'p50': round(percentile(latencies, 0.50), 1),
+            'p95': round(percentile(latencies, 0.95), 1),
+            'p99': round(percentile(latencies, 0.99), 1),
+        }
+
+    report = {url: summarize([result for target, result in zip(targets, results) if target == url]) for url in urls}
+    report['all'] = summarize(results)
+    return report
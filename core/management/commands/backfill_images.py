@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.images import get_renditions, process_image
+from core.signals import IMAGE_FIELDS
+
+
+def process(model_label, pk, field_name):
+    try:
+        return process_image(model_label, pk, field_name)
+    finally:
+        # Each worker thread opens its own connection
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the renditions, intrinsic size and placeholder of every uploaded image that is missing them, "
+        "processing the images in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help="Number of images processed at once; the work is mostly storage I/O (default: 8)"
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Process every image again, even those that are up to date"
+        )
+
+    def handle(self, *args, **options):
+        jobs = []
+        for model, field_names in IMAGE_FIELDS.items():
+            for field_name in field_names:
+                rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).only(
+                    'pk', field_name, f'{field_name}_renditions', f'{field_name}_placeholder'
+                )
+                for row in rows.iterator():
+                    field_file = getattr(row, field_name)
+                    stale = not get_renditions(field_file) or not getattr(row, f'{field_name}_placeholder')
+                    if options['force'] or stale:
+                        jobs.append((model._meta.label, row.pk, field_name))
+
+        if not jobs:
+            self.stdout.write("All images are up to date.")
+            return
+
+        self.stdout.write(f"Processing {len(jobs)} image(s) with {options['workers']} worker(s)...")
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(process, *job): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                model_label, pk, field_name = futures[future]
+                try:
+                    processed = future.result()
+                except Exception as error:
+                    processed, reason = False, error
+                else:
+                    reason = "could not be read or resized"
+                if processed:
+                    self.stdout.write(f"[{done}/{len(jobs)}] {model_label} #{pk} {field_name}")
+                else:
+                    failed += 1
+                    self.stderr.write(f"[{done}/{len(jobs)}] {model_label} #{pk} {field_name}: {reason}")
+
+        if failed:
+            raise CommandError(f"Processed {len(jobs) - failed} image(s), {failed} failed.")
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(jobs)} image(s)."))
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core.benchmark import (
+    VOLUMES, DEFAULT_TOLERANCE, BenchmarkError, seed, benchmark_urls, run_client, run_server, run_micro, compare,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database, measure every page in process and under load from a gunicorn process, "
+        "and fail if the results are worse than a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in VOLUMES.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=default, help=f"Seeded {name} (default: {default})"
+            )
+        parser.add_argument('--requests', type=int, default=50, help="In-process requests per page (default: 50)")
+        parser.add_argument(
+            '--server-requests', type=int, default=500, help="Requests per page to gunicorn (default: 500)"
+        )
+        parser.add_argument('--concurrency', type=int, default=10, help="Concurrent clients of gunicorn (default: 10)")
+        parser.add_argument('--workers', type=int, default=2, help="gunicorn workers (default: 2)")
+        parser.add_argument('--no-server', action='store_true', help="Only measure the pages in process")
+        parser.add_argument('--micro', action='store_true', help="Only run the micro-benchmarks, without a database")
+        parser.add_argument('--baseline', help="JSON results to compare with, e.g. from a run on the main branch")
+        parser.add_argument('--save', help="Write the results to this JSON file")
+        parser.add_argument(
+            '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+            help=f"Relative margin before a worse measure fails the run (default: {DEFAULT_TOLERANCE})"
+        )
+
+    def handle(self, *args, **options):
+        if options['micro']:
+            for name, results in run_micro().items():
+                self.stdout.write(f"\n{name:<40} {'µs':>10}")
+                for variant, microseconds in results.items():
+                    self.stdout.write(f"{variant:<40} {microseconds:>10.3f}")
+            return
+
+        volumes = {name: options[name] for name in VOLUMES}
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # A file rather than an in-memory SQLite database, so that gunicorn can serve it too
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+            old_name = connection.settings_dict['NAME']
+            database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                counts = seed(volumes)
+                self.stdout.write("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()) + ".")
+                urls = benchmark_urls()
+                report = {'volumes': volumes, 'client': run_client(urls, options['requests'])}
+                if not options['no_server']:
+                    # gunicorn must see every row
+                    connections.close_all()
+                    report['server'] = run_server(
+                        urls, database_name, options['server_requests'], options['concurrency'], options['workers']
+                    )
+            except BenchmarkError as error:
+                raise CommandError(error)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.write_report(report)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+        if baseline is not None:
+            if baseline.get('volumes') != volumes:
+                self.stderr.write("The baseline was run with other volumes, its results may not compare.")
+            regressions = compare(report, baseline, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(regression)
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS("No regression against the baseline."))
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"\n{'in process':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'queries':>8} {'KiB':>8}"
+        )
+        for name, row in report['client'].items():
+            self.stdout.write(
+                f"{name:<28} {row['p50']:>8} {row['p95']:>8} {row['p99']:>8} {row['throughput']:>8} "
+                f"{row['queries']:>8} {row['allocations']:>8}"
+            )
+        if 'server' in report:
+            self.stdout.write(f"\n{'gunicorn':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8}")
+            for name, row in report['server'].items():
+                self.stdout.write(
+                    f"{name:<28} {row['p50']:>8} {row['p95']:>8} {row['p99']:>8} {row['throughput']:>8}"
+                )
@@ -0,0 +1,128 @@
+import json
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.models import Project
+
+# Only the tables of the site are checked, not those of Django (sessions, content types, ...)
+TABLE_PREFIX = 'core_'
+
+
+def public_urls():
+    """Return the public pages whose queries must be served by indexes, the lists being followed to their next page."""
+    urls = [
+        (reverse('core:home'), {}),
+        (reverse('core:projects'), {}),
+        (reverse('core:achievements'), {}),
+        (reverse('core:about'), {}),
+    ]
+    project = Project.objects.filter(is_published=True).only('pk', 'slug').first()
+    if project is not None:
+        urls.append((reverse('core:project_detail', args=[project.pk, project.slug]), {}))
+    return urls
+
+
+def sequential_scans(sql, using=DEFAULT_DB_ALIAS) -> list:
+    """
+    Return the tables of the site that a query reads in full, according to the query planner.
+    Takes the SQL as captured, with the parameters interpolated, which both backends can explain, and the alias
+    of the database it ran on, e.g. a read replica.
+    On PostgreSQL sequential scans are disabled first, so that one is only planned when no index can serve the query,
+    whatever the size of the tables.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            with transaction.atomic(using=using):
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            nodes, tables = [plan[0]['Plan']], []
+            while nodes:
+                node = nodes.pop()
+                if node['Node Type'] == 'Seq Scan' and node['Relation Name'].startswith(TABLE_PREFIX):
+                    tables.append(node['Relation Name'])
+                nodes.extend(node.get('Plans', ()))
+            return tables
+
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [detail for *_, detail in cursor.fetchall()]
+            # Reading an unfiltered table in primary key order up to a LIMIT, e.g. the latest row, stops early
+            if ' WHERE ' not in sql and ' LIMIT ' in sql and not any('TEMP B-TREE' in detail for detail in details):
+                return []
+            # e.g. `SCAN core_project`, but `SCAN core_project USING INDEX project_published_idx` is fine
+            return [
+                detail.split()[1] for detail in details
+                if detail.startswith('SCAN ') and ' USING ' not in detail
+                and detail.split()[1].startswith(TABLE_PREFIX)
+            ]
+
+    raise CommandError(f"Query plans can't be checked on {connection.vendor}.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the public pages, EXPLAIN every query they run and fail if one of them reads a table "
+        "of the site in full, i.e. if the indexes of core.models no longer match the queries of the views."
+    )
+
+    def handle(self, *args, **options):
+        failures, checked = [], 0
+        client = Client()
+        for cursor_pagination in (False, True):
+            # The page cache would hide the queries; any host is fine as nothing leaves the process,
+            # and static URLs don't need the collected manifest
+            with override_settings(
+                PAGE_CACHE_ENABLED=False, CURSOR_PAGINATION=cursor_pagination, ALLOWED_HOSTS=['*'], DEBUG=False,
+                STORAGES={**settings.STORAGES, 'staticfiles': {
+                    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'
+                }},
+            ):
+                urls = public_urls()
+                for url, params in urls:
+                    # The public pages read from the replicas, if any
+                    with ExitStack() as stack:
+                        captures = [
+                            stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()
+                        ]
+                        response = client.get(url, params)
+                    if response.status_code != 200:
+                        raise CommandError(f"{url} answered {response.status_code}.")
+
+                    page = getattr(response, 'context_data', {}).get('page_obj')
+                    if page is not None and page.has_next() and not params:
+                        next_page = page.next_cursor if cursor_pagination else page.next_page_number()
+                        urls.append((url, {'cursor' if cursor_pagination else 'page': next_page}))
+
+                    label = f"{url}?{urlencode(params)}" if params else url
+                    if cursor_pagination:
+                        label += ' (cursor)'
+                    queries = [
+                        (capture.connection.alias, query['sql'])
+                        for capture in captures for query in capture.captured_queries
+                    ]
+                    for using, sql in queries:
+                        if not sql.lstrip().upper().startswith('SELECT'):
+                            continue
+                        checked += 1
+                        tables = sequential_scans(sql, using)
+                        if tables:
+                            failures.append((label, tables, sql))
+                            self.stdout.write(self.style.ERROR(f"SCAN {', '.join(tables)}  {label}"))
+                        elif options['verbosity'] > 1:
+                            self.stdout.write(f"ok  {label}  {sql[:120]}")
+
+        if failures:
+            for label, tables, sql in failures:
+                self.stderr.write(f"\n{label} reads {', '.join(tables)} in full:\n{sql}")
+            raise CommandError(f"{len(failures)} of {checked} queries read a table in full.")
+        self.stdout.write(self.style.SUCCESS(f"All {checked} queries are served by indexes."))
@@ -0,0 +1,39 @@
+import os
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import ExportError, export_pages
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every public page to static HTML, with precompressed .gz/.br siblings, in a directory "
+        "or a configured storage. Static and media files are not copied: they keep being served from their storages."
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--output', help="Directory the pages are written to")
+        target.add_argument(
+            '--storage', help="Alias of a storage in the STORAGES setting the pages are written to, e.g. `default`"
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Only render the pages whose rows changed since the last export, according to its manifest"
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Number of processes rendering pages (default: the number of CPUs)"
+        )
+
+    def handle(self, *args, **options):
+        storage = FileSystemStorage(location=options['output']) if options['output'] else storages[options['storage']]
+        log = self.stdout.write if options['verbosity'] > 1 else lambda message: None
+        try:
+            counts = export_pages(storage, options['incremental'], max(options['workers'], 1), log)
+        except ExportError as error:
+            raise CommandError(str(error)) from error
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {counts['rendered']} page(s), {counts['unchanged']} unchanged, {counts['removed']} removed."
+        ))
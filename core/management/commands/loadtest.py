@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.loadtest import run_load
+from core.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with concurrent requests to the public pages and report the throughput "
+        "and p50/p95/p99 latencies, e.g. to compare `gunicorn jolio.wsgi` with the ASGI deployment."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="URL of the server, e.g. http://127.0.0.1:8000")
+        parser.add_argument('--requests', type=int, default=500, help="Total number of requests (default: 500)")
+        parser.add_argument('--concurrency', type=int, default=20, help="Number of concurrent clients (default: 20)")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        paths = [reverse('core:home'), reverse('core:projects'), reverse('core:achievements'), reverse('core:about')]
+        project = Project.objects.filter(is_published=True).only('pk', 'slug').first()
+        if project is not None:
+            paths.append(reverse('core:project_detail', args=[project.pk, project.slug]))
+        base_url = options['base_url'].rstrip('/')
+        report = run_load([base_url + path for path in paths], options['requests'], options['concurrency'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{'url':<60} {'req':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for url, row in report.items():
+            self.stdout.write(
+                f"{url:<60} {row['requests']:>6} {row['errors']:>5} {row['throughput']:>8} "
+                f"{row['p50']:>8} {row['p95']:>8} {row['p99']:>8}"
+            )
+        if report['all']['errors']:
+            raise CommandError(f"{report['all']['errors']} requests failed.")
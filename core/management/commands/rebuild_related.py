@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import invalidate_pages
+from core.related import project_index, achievement_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the score of every pair of related projects and achievements from their current tags, "
+        "categories and types, replacing the stored index. Signals keep it up to date as items change; "
+        "rebuild it after changes that bypass them, e.g. queryset updates or raw imports."
+    )
+
+    def handle(self, *args, **options):
+        projects = project_index().rebuild()
+        achievements = achievement_index().rebuild()
+        invalidate_pages('project-relations')
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {projects} related project pair(s) and {achievements} related achievement pair(s)."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Project, Achievement, Story, SearchDocument
+from core.search import rebuild_documents
+
+
+class Command(BaseCommand):
+    help = "Recompute the search documents of every published project, achievement and story."
+
+    def handle(self, *args, **options):
+        count = rebuild_documents([Project, Achievement, Story], SearchDocument)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} document(s)."))
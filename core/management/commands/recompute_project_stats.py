@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Project
+
+
+class Command(BaseCommand):
+    help = "Render again the description of every project and recompute its word count, read time and excerpt."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of projects loaded and written per query (default: 500)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Project.objects.only('id', 'description').order_by('pk')
+
+        batch, total = [], 0
+        for project in queryset.iterator(chunk_size=batch_size):
+            project.render_content()
+            batch.append(project)
+            if len(batch) >= batch_size:
+                total += Project.objects.bulk_update(batch, Project.RENDERED_FIELDS)
+                batch = []
+        if batch:
+            total += Project.objects.bulk_update(batch, Project.RENDERED_FIELDS)
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed text stats for {total} project(s)."))
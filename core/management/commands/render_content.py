@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import invalidate_pages
+from core.content import rebuild_rendered_content
+from core.models import Project, Achievement, Skill, Story
+from core.signals import lastmod_dependencies
+
+
+class Command(BaseCommand):
+    help = "Render again the sanitized HTML and excerpt of every project, achievement, skill and story."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of rows loaded and written per query (default: 500)"
+        )
+
+    def handle(self, *args, **options):
+        # Every page depends on `update`, the sitemap and feeds on the lastmod of each model
+        dependencies = ['update']
+        for model in (Project, Achievement, Skill, Story):
+            pks = rebuild_rendered_content(model, options['batch_size'])
+            dependencies.extend(lastmod_dependencies(model, pks))
+            self.stdout.write(f"Rendered {len(pks)} {model._meta.verbose_name_plural}.")
+        invalidate_pages(*dependencies)
+        self.stdout.write(self.style.SUCCESS("Rendered content is up to date."))
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.storage import StaticStorage
+from core.sync import SyncError, sync_static
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload the collected static files to the S3 bucket of a storage, only those whose content changed, "
+        "several at a time. The staticfiles manifest is uploaded last."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--storage', default='staticfiles',
+            help="Alias of the core.storage.StaticStorage in the STORAGES setting whose bucket is synced"
+        )
+        parser.add_argument('--source', help="Directory of the collected static files (default: STATIC_ROOT)")
+        parser.add_argument(
+            '--collect', action='store_true',
+            help="Collect the static files to the source directory first, processed as the storage would"
+        )
+        parser.add_argument(
+            '--delete', action='store_true', help="Delete the files of the bucket that aren't collected anymore"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count the files to upload and delete")
+        parser.add_argument(
+            '--workers', type=int, help="Number of files uploaded at once (default: the workers option of the storage)"
+        )
+
+    def handle(self, *args, **options):
+        params = settings.STORAGES.get(options['storage'])
+        if params is None:
+            raise CommandError(f"There is no {options['storage']!r} storage in the STORAGES setting.")
+        if options['workers']:
+            params = {**params, 'OPTIONS': {**params.get('OPTIONS', {}), 'workers': max(options['workers'], 1)}}
+        # A storage of its own, whose listing of the bucket is not kept from a previous run
+        storage = storages.create_storage(params)
+        if not isinstance(storage, StaticStorage):
+            raise CommandError(f"The {options['storage']!r} storage is not a core.storage.StaticStorage.")
+        source = options['source'] or settings.STATIC_ROOT
+
+        if options['collect']:
+            with override_settings(STATIC_ROOT=source, STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'core.storage.LocalStaticStorage',
+            }}):
+                call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+        log = self.stdout.write if options['verbosity'] > 1 else lambda message: None
+        try:
+            counts = sync_static(storage, source, options['delete'], options['dry_run'], log)
+        except SyncError as error:
+            raise CommandError(str(error)) from error
+        action = "Would upload" if options['dry_run'] else "Uploaded"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {counts['uploaded']} file(s), {counts['unchanged']} unchanged, {counts['deleted']} deleted."
+        ))
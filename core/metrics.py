@@ -0,0 +1,135 @@
+import threading
+
+# Create your metrics here.
+# Process-local metrics, rendered in the Prometheus text exposition format by `core.views.metrics`.
+# Each gunicorn worker keeps its own values; Prometheus sums them per instance label.
+
+
+class Metric:
+    """Base class of a metric family, with one value per combination of label values."""
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def samples(self):
+        """Yield `(suffix, labels, value)` tuples for every value of the family."""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield '', self._format_labels(key), value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines += [f'{self.name}{suffix}{labels} {value}' for suffix, labels, value in self.samples()]
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. the number of cache hits."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """A value that can go up and down, e.g. the number of open connections."""
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """The distribution of observed values, e.g. latencies, counted in cumulative buckets of upper bounds."""
+    type = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def get(self, **labels):
+        """Return the cumulative `buckets`, the `sum` and the `count` of the observations, None if there are none."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return {**state, 'buckets': list(state['buckets'])} if state else None
+
+    def samples(self):
+        with self._lock:
+            items = [(key, {**state, 'buckets': list(state['buckets'])}) for key, state in self._values.items()]
+        for key, state in items:
+            for bound, count in zip(self.buckets, state['buckets']):
+                yield '_bucket', self._format_labels(key, [('le', str(float(bound)))]), count
+            yield '_bucket', self._format_labels(key, [('le', '+Inf')]), state['count']
+            yield '_sum', self._format_labels(key), state['sum']
+            yield '_count', self._format_labels(key), state['count']
+
+
+class Registry:
+    """The set of metrics exposed by the process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,201 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from core.instrumentation import (
+    RequestStats, request_stats, request_duration, request_queries, request_db_duration, request_render_duration,
+    request_cache_lookups,
+)
+from core.queries import QueryInspectionError, QueryRecorder, inspector_settings
+from core.routers import replica_state
+from core.utils import TimeSinceChanges, request_now, time_since_changes
+
+# Create your middleware here.
+
+logger = logging.getLogger('core.queries')
+
+PIN_COOKIE = 'jolio_primary'
+
+
+def inline(hook):
+    """Return `hook` as a coroutine function running it in place."""
+    async def coroutine(*args):
+        return hook(*args)
+    return coroutine
+
+
+class AsyncCapableMiddleware:
+    """
+    Base of the middleware serving sync and async requests alike, so that under ASGI a request reaches an async
+    view without switching threads: `__call__()` serves sync requests and `__acall__()` async ones.
+    Their `process_view()` and `process_template_response()` hooks only set request state, and are run on the
+    event loop rather than adapted to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            for name in ('process_view', 'process_template_response'):
+                if hasattr(self, name):
+                    setattr(self, name, inline(getattr(self, name)))
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """
+    Let the GET requests of the core views read from the replicas (see `core.routers`), unless the client
+    wrote recently: a request that writes sets a cookie pinning the next ones to the primary for a while.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = {'replicas': False, 'wrote': False}
+        token = replica_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_state.reset(token)
+        return self.pin(request, response, state)
+
+    async def __acall__(self, request):
+        state = {'replicas': False, 'wrote': False}
+        token = replica_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_state.reset(token)
+        return self.pin(request, response, state)
+
+    def pin(self, request, response, state):
+        if state['wrote'] and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, secure=request.is_secure(), httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replica_state.get()['replicas'] = (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.app_name == 'core'
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+
+class RequestNowMiddleware(AsyncCapableMiddleware):
+    """
+    Read the clock once per request: the relative times of a page are all counted from its start, and when the
+    first of them changes is noted for the page cache (see `core.utils`).
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = request_now.set(timezone.now())
+        changes_token = time_since_changes.set(TimeSinceChanges())
+        try:
+            return self.get_response(request)
+        finally:
+            time_since_changes.reset(changes_token)
+            request_now.reset(token)
+
+    async def __acall__(self, request):
+        token = request_now.set(timezone.now())
+        changes_token = time_since_changes.set(TimeSinceChanges())
+        try:
+            return await self.get_response(request)
+        finally:
+            time_since_changes.reset(changes_token)
+            request_now.reset(token)
+
+
+class PerformanceMiddleware(AsyncCapableMiddleware):
+    """
+    Time every request, its database queries, template rendering and site cache lookups, per view
+    (see `core.instrumentation`). The totals are exported as histograms at /hq/metrics/ and, with SERVER_TIMING,
+    sent to the browser in a `Server-Timing` header.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        return self.record(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        return self.record(request, response, stats)
+
+    def record(self, request, response, stats):
+        total = time.perf_counter() - stats.start
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        request_duration.observe(total, view=view)
+        request_queries.observe(stats.queries, view=view)
+        request_db_duration.observe(stats.db, view=view)
+        request_render_duration.observe(stats.render, view=view)
+        if stats.cache_hits:
+            request_cache_lookups.inc(stats.cache_hits, view=view, result='hit')
+        if stats.cache_misses:
+            request_cache_lookups.inc(stats.cache_misses, view=view, result='miss')
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = stats.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered, the callback right after
+        stats = request_stats.get()
+        stats.render_start = time.perf_counter()
+
+        def rendered(response):
+            stats.render += time.perf_counter() - stats.render_start
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryInspectorMiddleware:
+    """
+    Development only: report the duplicate, slow and lazily loaded queries of every request, with the template
+    line or code that ran them (see `core.queries`), or fail the request with QUERY_INSPECTOR['RAISE'].
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            # Templates are rendered by then, but not the content of streamed responses
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        label = f'{request.method} {request.get_full_path()}' + (f' ({match.view_name})' if match else '')
+        options = inspector_settings()
+        report = recorder.report(label, options)
+        if report:
+            if options['RAISE']:
+                raise QueryInspectionError(report)
+            logger.warning(report)
+        return response
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:30
+
+import re
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+# Frozen copies of the core.utils helpers as of this migration, so that later changes to them
+# don't change what it computes
+
+def html_to_text(html):
+    if not html:
+        return ''
+    return re.sub(r'\s+', ' ', unescape(strip_tags(html))).strip()
+
+
+def count_words(text):
+    return len(re.findall(r'\b\w+\b', text))
+
+
+def read_time(word_count, wpm=200):
+    return max((word_count + wpm - 1) // wpm, 1)
+
+
+def excerpt(text, length=300):
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+
+
+def backfill_text_stats(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    projects = list(Project.objects.only('id', 'description'))
+    for project in projects:
+        plain_text = html_to_text(project.description)
+        project.word_count = count_words(plain_text)
+        project.read_time = read_time(project.word_count)
+        project.excerpt = excerpt(plain_text)
+    Project.objects.bulk_update(projects, ['word_count', 'read_time', 'excerpt'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_story_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Plain-text description excerpt'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='read_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, help_text='Read time in minutes'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Description word count'),
+        ),
+        migrations.RunPython(backfill_text_stats, migrations.RunPython.noop),
+    ]
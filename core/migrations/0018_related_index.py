@@ -0,0 +1,89 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:39
+
+import math
+from collections import defaultdict
+from itertools import combinations
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# A frozen copy of `core.related.RelationIndex.rebuild()` as of this migration, so that later changes
+# to the scoring don't change what it computes
+
+PROJECT_BONUSES = {'category': 1.0, 'project_type': 0.5}
+
+
+def rebuild_index(model, relation_model, bonuses=None):
+    bonuses = bonuses or {}
+    through = model._meta.get_field('tags').remote_field.through
+    links = through._default_manager.values_list(f'{model._meta.model_name}_id', 'tag_id')
+    counts = through._default_manager.values('tag_id').annotate(count=Count('pk')).values_list('tag_id', 'count')
+    weights = {tag_id: 1 / math.log2(1 + count) for tag_id, count in counts}
+
+    items_by_tag = defaultdict(list)
+    for pk, tag_id in links:
+        items_by_tag[tag_id].append(pk)
+    scores = defaultdict(float)
+    for tag_id, items in items_by_tag.items():
+        for pair in combinations(sorted(items), 2):
+            scores[pair] += weights[tag_id]
+    if bonuses and scores:
+        rows = model._default_manager.filter(pk__in={pk for pair in scores for pk in pair}).values('pk', *bonuses)
+        attributes = {row['pk']: row for row in rows}
+        for first, second in scores:
+            scores[first, second] += sum(
+                weight for field, weight in bonuses.items() if attributes[first][field] == attributes[second][field]
+            )
+
+    relation_model._default_manager.all().delete()
+    relation_model._default_manager.bulk_create([
+        relation_model(source_id=source, target_id=target, score=score)
+        for (first, second), score in scores.items()
+        for source, target in ((first, second), (second, first))
+    ], batch_size=1000)
+
+
+def build_related_index(apps, schema_editor):
+    rebuild_index(apps.get_model('core', 'Project'), apps.get_model('core', 'ProjectRelation'), PROJECT_BONUSES)
+    rebuild_index(apps.get_model('core', 'Achievement'), apps.get_model('core', 'AchievementRelation'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AchievementRelation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relations', to='core.achievement')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reverse_relations', to='core.achievement')),
+            ],
+            options={
+                'ordering': ['source', '-score'],
+                'indexes': [models.Index(fields=['source', '-score'], name='achievement_relation_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'target'), name='unique_achievement_relation')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectRelation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relations', to='core.project')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reverse_relations', to='core.project')),
+            ],
+            options={
+                'ordering': ['source', '-score'],
+                'indexes': [models.Index(fields=['source', '-score'], name='project_relation_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'target'), name='unique_project_relation')],
+            },
+        ),
+        migrations.RunPython(build_related_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:43
+
+import re
+from html import unescape
+from uuid import uuid4
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.core.cache import caches
+from django.db import migrations, models, transaction
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+
+# Frozen copies of the core.search helpers as of this migration, so that later changes to the documents
+# don't change what it indexes
+
+def html_to_text(html):
+    if not html:
+        return ''
+    return re.sub(r'\s+', ' ', unescape(strip_tags(html))).strip()
+
+
+def document_values(instance):
+    kind = instance._meta.model_name
+    if kind == 'project':
+        parts = [instance.client_name, html_to_text(instance.description)]
+        url = reverse('core:project_detail', args=[instance.pk, instance.slug])
+    elif kind == 'achievement':
+        parts = [html_to_text(instance.content)]
+        url = f"{reverse('core:achievements')}#achievement-{instance.pk}"
+    else:
+        parts = [instance.subtitle, instance.period, html_to_text(instance.content)]
+        url = f"{reverse('core:about')}#{'story' if instance.parent_id is None else 'sub'}-{instance.pk}"
+    if kind in ('project', 'achievement'):
+        parts.extend(instance.tags.values_list('name', flat=True))
+    return {'title': instance.title, 'text': ' '.join(part for part in parts if part), 'url': url}
+
+
+def is_searchable(instance):
+    if instance._meta.model_name == 'story' and instance.parent_id is not None:
+        return instance.is_published and instance.parent.is_published
+    return instance.is_published
+
+
+def rebuild_documents(models, document_model, connection):
+    documents = [
+        document_model(kind=model._meta.model_name, object_id=instance.pk, **document_values(instance))
+        for model in models
+        for instance in model._default_manager.filter(is_published=True).iterator()
+        if is_searchable(instance)
+    ]
+    document_model._default_manager.all().delete()
+    document_model._default_manager.bulk_create(documents, batch_size=500)
+    if connection.vendor == 'postgresql':
+        config = getattr(settings, 'SEARCH_CONFIG', 'english')
+        document_model._default_manager.update(
+            search_vector=SearchVector('title', weight='A', config=config) + SearchVector('text', weight='B', config=config)
+        )
+    # The in-memory indexes of the running processes are stale
+    cache = caches[getattr(settings, 'SITE_CACHE_ALIAS', 'default')]
+    transaction.on_commit(lambda: cache.set('core:search:version', uuid4().hex, None))
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX search_document_vector_idx ON core_searchdocument USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_document_vector_idx')
+
+
+def index_documents(apps, schema_editor):
+    models = [apps.get_model('core', name) for name in ('Project', 'Achievement', 'Story')]
+    rebuild_documents(models, apps.get_model('core', 'SearchDocument'), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_related_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('achievement', 'Achievement'), ('story', 'Story')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=300)),
+                ('text', models.TextField(blank=True, default='')),
+                ('url', models.CharField(max_length=300)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['-created_at', '-event_date', '-id'], name='achievement_created_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at', '-id'], name='project_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='achievement',
+            name='achievement_created_event_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='project',
+            name='project_created_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at', '-event_date', '-id'], name='achievement_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['updated_at'], name='achievement_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at', '-id'], name='project_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['updated_at'], name='project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['name'], name='skill_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(fields=['updated_at'], name='skill_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(condition=models.Q(('is_published', True), ('parent__isnull', True)), fields=['-created_at'], name='story_published_root_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['parent', 'created_at'], name='story_published_child_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['updated_at'], name='story_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:50
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    # A frozen copy of `core.stories.rebuild_paths()` as of this migration: every path is built
+    # level by level from the roots, from the zero-padded ids of the ancestors
+    Story = apps.get_model('core', 'Story')
+    stories = list(Story.objects.only('pk', 'parent_id', 'path', 'depth'))
+    children = {}
+    for story in stories:
+        children.setdefault(story.parent_id, []).append(story)
+
+    level, parent_paths = children.get(None, []), {None: ''}
+    while level:
+        for story in level:
+            story.path = f'{parent_paths[story.parent_id]}{story.pk:08d}/'
+            story.depth = story.path.count('/') - 1
+            parent_paths[story.pk] = story.path
+        level = [child for story in level for child in children.get(story.pk, [])]
+    Story.objects.bulk_update(stories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_published_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='story',
+            name='story_published_root_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='story',
+            name='story_published_child_idx',
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['path'], name='story_published_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['path'], name='story_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
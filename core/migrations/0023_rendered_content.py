@@ -0,0 +1,232 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:53
+
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+# A frozen copy of the core.content pipeline as of this migration, so that later changes to the allowlist
+# or the markup don't change what it renders. The renditions of the images are read from the
+# `<field>_renditions` columns of the uploads rather than looked up in the storage.
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'ins', 'kbd', 'li', 'mark', 'ol', 'p', 'pre',
+    's', 'small', 'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead',
+    'tr', 'u', 'ul',
+}
+
+ALLOWED_ATTRIBUTES = {
+    '*': {'title'},
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+}
+
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto', 'tel'}
+
+DROPPED_TAGS = {
+    'script', 'style', 'template', 'iframe', 'object', 'embed', 'noscript', 'svg', 'math', 'textarea', 'select',
+}
+
+VOID_TAGS = {'br', 'hr', 'img'}
+
+RENDITION_MIMES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+CONTENT_IMAGE_SIZES = '(min-width: 1024px) 50vw, 100vw'
+
+IMAGE_FIELDS = (('Project', 'cover_image'), ('ProjectMedia', 'image'), ('Achievement', 'image'), ('Story', 'image'))
+
+
+def is_safe_url(url):
+    cleaned = ''.join(char for char in url if char.isprintable() and not char.isspace())
+    try:
+        return urlsplit(cleaned).scheme.lower() in ALLOWED_SCHEMES
+    except ValueError:
+        return False
+
+
+def format_attributes(attributes):
+    return ''.join(f' {name}="{escape(str(value))}"' for name, value in attributes.items())
+
+
+class Sanitizer(HTMLParser):
+
+    def __init__(self, renditions, prefix):
+        super().__init__(convert_charrefs=True)
+        self.renditions = renditions
+        self.prefix = prefix
+        self.parts = []
+        self.open_tags = []
+        self.dropping = []
+
+    def render_image(self, attributes):
+        img = f"<img{format_attributes({**attributes, 'loading': 'lazy', 'decoding': 'async'})}>"
+        path = urlsplit(attributes['src']).path
+        name = unquote(path[len(self.prefix):]) if path.startswith(self.prefix) and path != self.prefix else None
+        formats = self.renditions.get(name, {})
+        if not formats:
+            return img
+        sources = ''.join(
+            '<source{}>'.format(format_attributes({
+                'type': mime,
+                'srcset': ', '.join(
+                    f'{default_storage.url(rendition)} {width}w'
+                    for width, rendition in sorted(formats[fmt].items(), key=lambda item: int(item[0]))
+                ),
+                'sizes': CONTENT_IMAGE_SIZES,
+            }))
+            for fmt, mime in RENDITION_MIMES.items() if formats.get(fmt)
+        )
+        return f'<picture style="display: contents">{sources}{img}</picture>'
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            if tag in DROPPED_TAGS:
+                self.dropping.append(tag)
+            return
+        if tag in DROPPED_TAGS:
+            self.dropping.append(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        attributes = {}
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            attributes[name] = value
+        if tag == 'a' and attributes.get('target') == '_blank':
+            attributes['rel'] = 'noopener noreferrer'
+
+        if tag == 'img':
+            if attributes.get('src'):
+                self.parts.append(self.render_image(attributes))
+            return
+        self.parts.append(f'<{tag}{format_attributes(attributes)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag == self.dropping[-1]:
+                self.dropping.pop()
+            return
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        self.parts.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        self.open_tags = []
+
+
+def render_content(html, renditions, prefix, length=300):
+    if not html:
+        return '', ''
+    sanitizer = Sanitizer(renditions, prefix)
+    sanitizer.feed(html)
+    sanitizer.close()
+    sanitized = ''.join(sanitizer.parts).strip()
+    text = re.sub(r'\s+', ' ', unescape(strip_tags(sanitized))).strip()
+    if len(text) > length:
+        text = text[:length].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+    return sanitized, text
+
+
+def stored_renditions(apps):
+    """Return the renditions of every uploaded image by its storage name."""
+    renditions = {}
+    for model_name, field in IMAGE_FIELDS:
+        rows = apps.get_model('core', model_name).objects.exclude(**{field: ''}).exclude(**{field: None})
+        for name, stored in rows.values_list(field, f'{field}_renditions'):
+            if stored and stored.get('source') == name:
+                renditions[name] = stored.get('formats', {})
+    return renditions
+
+
+def render_contents(apps, schema_editor):
+    renditions = stored_renditions(apps)
+    prefix = urlsplit(default_storage.url('_')).path[:-1]
+    for model_name, content_field in (
+        ('Project', 'description'), ('Achievement', 'content'), ('Skill', 'description'), ('Story', 'content'),
+    ):
+        model = apps.get_model('core', model_name)
+        html_field = f'{content_field}_html'
+        instances = list(model.objects.only('pk', content_field).order_by('pk'))
+        for instance in instances:
+            html, text = render_content(getattr(instance, content_field), renditions, prefix)
+            setattr(instance, html_field, html)
+            instance.excerpt = text
+        model.objects.bulk_update(instances, [html_field, 'excerpt'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_story_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Plain-text content excerpt'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Plain-text description excerpt'),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Plain-text content excerpt'),
+        ),
+        migrations.RunPython(render_contents, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,265 @@
 from datetime import datetime
+from hashlib import md5
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
 from django.views.generic.base import ContextMixin
 
-from core.models import Update
+from core.cache import (
+    get_availability, get_is_available_for_work, get_page_cache_key, get_cached_page, set_cached_page,
+    page_cache_requests, get_relative_times_since, set_relative_times
+)
+from core.concurrency import concurrently, evaluate
+from core.pagination import CursorPaginator, InvalidCursor
+from core.routers import read_from_primary
+from core.utils import time_since_changes_at
 
 
 # Create your mixins here.
 
 class CommonContextMixin(ContextMixin):
+    def get_context_queries(self) -> dict:
+        """
+        Return the independent reads of the context by name, as querysets, evaluated into lists, or callables
+        returning evaluated values. Sync views evaluate them in turn, async views at the same time
+        (see `AsyncViewMixin` and `core.concurrency`).
+        """
+        return {'is_available_for_work': get_is_available_for_work}
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['is_available_for_work'] = Update.objects.last().is_available_for_work if Update.objects.exists() else False
+        results = getattr(self, 'context_results', None)
+        if results is None:
+            results = {name: evaluate(query) for name, query in self.get_context_queries().items()}
+        context.update(results)
         context['copyright_year'] = datetime.now().year
         return context
+
+
+class AsyncViewMixin:
+    """
+    Serve GET asynchronously: the `get_context_queries()` of the view are read at the same time, the querysets
+    with the async ORM, then its sync `get()` builds the context from their results and renders the template
+    on the thread of the request. `ConditionalGetMixin` and `PageCacheMixin` switch to their async paths for
+    such views. Must come first in the bases.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queries = self.get_context_queries()
+        self.context_results = dict(zip(queries, await concurrently(*queries.values())))
+        return await sync_to_async(self.render_get)(request, *args, **kwargs)
+
+    def render_get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+
+class PageCacheMixin:
+    """
+    Serve GET requests from the page cache, keyed by host, path and `page_cache_params`.
+    On a miss the page is rendered from the primary and stored along with the dependencies returned by
+    `get_page_dependencies()`, which `core.signals` bumps when the underlying rows change, until the first
+    relative time it shows changes.
+    The validators of `ConditionalGetMixin` are stored with the page, so a hit is revalidated without any query.
+    Must come before `ConditionalGetMixin` and the view class in the bases so that it wraps their `dispatch()`.
+    """
+    page_cache_params = ('page', 'cursor')
+
+    def get_page_dependencies(self, context):
+        """Return the names of the dependencies the page is rendered from, e.g. `project:12`."""
+        return ['update']
+
+    def get_changes_at(self):
+        """Return when the first relative time of the rendered page changes, e.g. "Just now", or None."""
+        return time_since_changes_at()
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+                not getattr(settings, 'PAGE_CACHE_ENABLED', True)
+                or request.method not in ('GET', 'HEAD')
+                or not set(request.GET).issubset(self.page_cache_params)
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = get_page_cache_key(request, self.page_cache_params)
+        if self.view_is_async:
+            return self.dispatch_cached_async(request, key, *args, **kwargs)
+
+        page = get_cached_page(key)
+        if page is not None:
+            return self.cached_response(request, page)
+
+        page_cache_requests.inc(view=type(self).__name__, result='miss')
+        read_from_primary()
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            # Dependencies are collected once the template evaluated the querysets of the context
+            response.add_post_render_callback(lambda rendered: set_cached_page(
+                key, rendered, self.get_page_dependencies(rendered.context_data), self.get_changes_at()
+            ))
+        return response
+
+    async def dispatch_cached_async(self, request, key, *args, **kwargs):
+        page = await sync_to_async(get_cached_page)(key)
+        if page is not None:
+            return self.cached_response(request, page)
+
+        page_cache_requests.inc(view=type(self).__name__, result='miss')
+        read_from_primary()
+        response = await super().dispatch(request, *args, **kwargs)
+        # Async views return their response rendered
+        if response.status_code == 200 and hasattr(response, 'context_data'):
+            dependencies = self.get_page_dependencies(response.context_data)
+            await sync_to_async(set_cached_page)(key, response, dependencies, self.get_changes_at())
+        return response
+
+    def cached_response(self, request, page):
+        page_cache_requests.inc(view=type(self).__name__, result='hit')
+        response = HttpResponse(page['content'])
+        for name, value in page['headers'].items():
+            response[name] = value
+        # Answered from the ETag and Last-Modified the page was rendered with
+        last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+        return get_conditional_response(
+            request, etag=response.get('ETag'), last_modified=last_modified, response=response
+        )
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with `304 Not Modified`, without running the view, when the client's copy is current.
+    The validators are derived from `get_validator_values()`, which should be cheaper than rendering the page:
+    the latest `updated_at` of the tables the page shows and the versions of their dependencies, plus the
+    availability flag. The relative times the page shows, e.g. "Just now", change without any of them changing:
+    the validators also hold since when they read as they do, recorded when the page is rendered.
+    Must come before the view class in the bases so that it wraps `dispatch()`.
+    """
+
+    def get_validator_values(self):
+        """
+        Return the values the page content depends on, datetimes being used for `Last-Modified`.
+        Returning None skips the conditional handling, e.g. to let the view answer `404`.
+        """
+        availability = get_availability()
+        return [availability['updated_at'], availability['is_available_for_work']]
+
+    def get_relative_times_key(self, request):
+        page = f'{type(self).__name__}:{request.get_full_path()}'
+        return md5(page.encode(), usedforsecurity=False).hexdigest()
+
+    def get_validators(self, request):
+        """
+        Return the validator values of the page and since when its relative times read as they do, None if that
+        is unknown, e.g. before the page is first rendered; or None to skip the conditional handling.
+        """
+        values = self.get_validator_values()
+        if values is None:
+            return None
+        return values, get_relative_times_since(self.get_relative_times_key(request), values)
+
+    async def aget_validators(self, request):
+        """Return `get_validators()` from an async view, run on the thread of the request."""
+        return await sync_to_async(self.get_validators)(request)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self.dispatch_conditional_async(request, *args, **kwargs)
+
+        validators = self.get_validators(request)
+        if validators is None:
+            return super().dispatch(request, *args, **kwargs)
+        response = self.check_conditions(request, *validators)
+        if response is not None:
+            return response
+        return self.add_validators(request, super().dispatch(request, *args, **kwargs), *validators)
+
+    async def dispatch_conditional_async(self, request, *args, **kwargs):
+        validators = await self.aget_validators(request)
+        if validators is None:
+            return await super().dispatch(request, *args, **kwargs)
+        response = self.check_conditions(request, *validators)
+        if response is not None:
+            return response
+        response = await super().dispatch(request, *args, **kwargs)
+        # Async views return their response rendered
+        return await sync_to_async(self.add_validators)(request, response, *validators)
+
+    def get_validator_headers(self, request, values, since):
+        """Return a response holding the `ETag`, `Last-Modified` and `Cache-Control` headers of the page."""
+        validator = f'{type(self).__name__}:{request.get_full_path()}:{values!r}:{since!r}'
+        etag = f'W/"{md5(validator.encode(), usedforsecurity=False).hexdigest()}"'
+        timestamps = [value for value in [*values, since] if isinstance(value, datetime)]
+
+        headers = HttpResponse()
+        headers['ETag'] = etag
+        headers['Last-Modified'] = http_date(max(timestamps).timestamp())
+        # Browsers must revalidate, so that edits show up on the next view
+        patch_cache_control(headers, no_cache=True)
+        return headers
+
+    def check_conditions(self, request, values, since):
+        """
+        Return the `304 Not Modified` (or `412 Precondition Failed`) response answering the request when the
+        client's copy is current, else None.
+        """
+        if since is None:
+            # Which relative times the client's copy shows is unknown
+            return None
+        headers = self.get_validator_headers(request, values, since)
+        last_modified = parse_http_date_safe(headers['Last-Modified'])
+        # Returns the given response unless it is a 304 Not Modified or 412 Precondition Failed
+        response = get_conditional_response(
+            request, etag=headers['ETag'], last_modified=last_modified, response=headers
+        )
+        return None if response is headers else response
+
+    def add_validators(self, request, response, values, since):
+        """Add the validator headers to the response once it is rendered, recording its relative times."""
+        def add(rendered):
+            if rendered.status_code != 200:
+                return
+            key = self.get_relative_times_key(request)
+            recorded = set_relative_times(key, values, time_since_changes_at(), since)
+            for name, value in self.get_validator_headers(request, values, recorded).items():
+                if name.lower() != 'content-type':
+                    rendered[name] = value
+
+        if getattr(response, 'is_rendered', True):
+            add(response)
+        else:
+            response.add_post_render_callback(add)
+        return response
+
+
+class CursorPaginationMixin:
+    """
+    Paginate a list view by keyset on `cursor_ordering` instead of by offset, when `cursor_pagination` is set
+    (`CURSOR_PAGINATION` if None). Pages are then selected with the opaque `?cursor=` parameter,
+    `page_obj` has `previous_cursor` and `next_cursor` instead of page numbers, and no count is queried.
+    """
+    cursor_ordering = None
+    cursor_pagination = None
+
+    def uses_cursor_pagination(self):
+        enabled = self.cursor_pagination
+        if enabled is None:
+            enabled = getattr(settings, 'CURSOR_PAGINATION', False)
+        return bool(enabled and self.cursor_ordering)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.uses_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -1,19 +1,42 @@
-import re
-
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
 from slugify import slugify
-from django.utils.html import strip_tags
 
-from core.utils import time_since
+from core.content import render_content
+from core.stories import update_path
+from core.utils import time_since, html_to_text, count_words, read_time
 
 
 # Create your models here.
+class RenderedContentMixin:
+    """
+    Renders the rich text of `CONTENT_FIELD` on save into `<CONTENT_FIELD>_html` and `excerpt`
+    (see core.content), so that templates output them as is instead of filtering the raw HTML.
+    Bulk writes that bypass `save()` should call `render_content()` themselves and write `RENDERED_FIELDS`.
+    """
+    CONTENT_FIELD = 'content'
+    RENDERED_FIELDS = ('content_html', 'excerpt')
+
+    def render_content(self):
+        html, self.excerpt = render_content(getattr(self, self.CONTENT_FIELD))
+        setattr(self, f'{self.CONTENT_FIELD}_html', html)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.CONTENT_FIELD in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+
+
 class Update(models.Model):
     is_available_for_work = models.BooleanField(default=True, help_text="Is the user available for work?")
     updated_at = models.DateTimeField(auto_now=True, help_text="Last update timestamp")
 
 
-class Project(models.Model):
+class Project(RenderedContentMixin, models.Model):
     """
     Represents a project with various attributes like title, description, type, category, etc.
     Provides methods for calculating read time, time since creation/update, and auto-generating slugs.
@@ -21,20 +44,29 @@ class Project(models.Model):
         title (str): The title of the project.
         slug (str): A unique URL-friendly identifier for the project, auto-generated from the title.
         description (str): A brief description of the project.
+        description_html (str): The sanitized description, ready to output <i>(rendered on save)</i>.
         project_type (str): The type of project, e.g., personal, contract, community, open source.
         category (str): The category of the project, e.g., design, development, mixed.
         client_name (str): Name of the client for contract projects; optional for personal projects.
         cover_image (ImageField): An optional cover image for the project.
+        cover_image_renditions (dict): Names of the resized copies of the cover image <i>(generated on upload)</i>.
+        cover_image_width, cover_image_height (int): Intrinsic size of the cover image <i>(computed on upload)</i>.
+        cover_image_placeholder (str): Tiny inline preview of the cover image <i>(computed on upload)</i>.
         created_at (date): The date when the project was created.
         updated_at (date): The date when the project was last updated.
         is_published (bool): Whether the project is visible on the site.
         live_url (str): Optional URL to view the live project.
         repo_url (str): Optional URL to view the project's repository.
+        word_count (int): Number of words in the description <i>(computed on save)</i>.
+        read_time (int): Estimated read time of the description in minutes <i>(computed on save)</i>.
+        excerpt (str): Plain-text excerpt of the description <i>(computed on save)</i>.
     Methods:
         get_read_time(): Calculates the estimated read time for the project description.
         time_since_created(): Returns a human-readable string of time since the project was created.
         time_since_updated(): Returns a human-readable string of time since the project was last updated.
-        save(): Auto-generates the slug from the title before saving.
+        get_related(): Returns the most similar published projects.
+        render_content(): Renders the description and recomputes the word count, read time and excerpt from it.
+        save(): Auto-generates the slug from the title and renders the description before saving.
     """
 
     class ProjectType(models.TextChoices):
@@ -51,6 +83,7 @@ class Project(models.Model):
     title = models.CharField(max_length=255, help_text="Project title")
     slug = models.SlugField(unique=True, help_text="Unique URL-friendly identifier <i>(auto-generated)</i>")
     description = models.TextField(blank=True, null=True, help_text="Brief project description")
+    description_html = models.TextField(blank=True, default="", editable=False)
     project_type = models.CharField(
         max_length=20, choices=ProjectType.choices, default=ProjectType.PERSONAL, help_text="Project type"
     )
@@ -64,6 +97,10 @@ class Project(models.Model):
     cover_image = models.ImageField(
         upload_to="projects/covers/", blank=True, null=True
     )
+    cover_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    cover_image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    cover_image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    cover_image_placeholder = models.TextField(blank=True, default="", editable=False)
     tags = models.ManyToManyField('Tag', blank=True, related_name="projects")
     created_at = models.DateTimeField(auto_now_add=True, help_text="Project creation date")
     updated_at = models.DateTimeField(auto_now=True, help_text="Project last update date")
@@ -73,37 +110,53 @@ class Project(models.Model):
     live_url = models.URLField(blank=True, null=True, help_text="Project live URL")
     repo_url = models.URLField(blank=True, null=True, help_text="Project repository URL")
 
+    # derived from the description on save
+    word_count = models.PositiveIntegerField(default=0, editable=False, help_text="Description word count")
+    read_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Read time in minutes")
+    excerpt = models.TextField(blank=True, default="", editable=False, help_text="Plain-text description excerpt")
+
+    CONTENT_FIELD = 'description'
+    RENDERED_FIELDS = ('description_html', 'word_count', 'read_time', 'excerpt')
+
+    # columns rendered by the project cards on list pages
+    CARD_FIELDS = (
+        'id', 'slug', 'title', 'project_type', 'category', 'cover_image', 'cover_image_renditions',
+        'cover_image_width', 'cover_image_height', 'cover_image_placeholder', 'created_at', 'read_time', 'excerpt',
+        'live_url', 'repo_url',
+    )
+
+    class Meta:
+        indexes = [
+            # the public lists, by offset or by keyset, only show published projects
+            models.Index(
+                fields=["-created_at", "-id"], condition=models.Q(is_published=True), name="project_published_idx"
+            ),
+            # conditional GET validators, Max(updated_at) on every page view
+            models.Index(fields=["updated_at"], name="project_updated_idx"),
+        ]
+
     def get_read_time(self):
         """
         Calculate estimated read time for the project description.
         Handles HTML content by stripping tags and calculating based on plain text.
+        Templates should read the stored `read_time` instead.
         """
-        # Return early if no description
-        if not self.description:
-            return 1
+        return read_time(count_words(html_to_text(self.description)))
 
-        # Strip HTML tags to get plain text
-        plain_text = strip_tags(self.description)
-
-        # Remove extra whitespace and newlines
-        clean_text = re.sub(r'\s+', ' ', plain_text).strip()
-
-        # Split into words (more accurate than simple split)
-        words = re.findall(r'\b\w+\b', clean_text)
-        total_words = len(words)
-
-        # Average reading speed (words per minute)
-        # 200-250 is typical for adults, using 200 for conservative estimate
-        wpm = 200
-
-        # Calculate minutes, rounding up using ceiling division
-        if total_words == 0:
-            return 1
-
-        minutes = (total_words + wpm - 1) // wpm
+    def render_content(self):
+        """
+        Render the description and recompute the stored word count, read time and excerpt from it.
+        Called on save; bulk writes that bypass `save()` should call it themselves.
+        """
+        super().render_content()
+        self.word_count = count_words(html_to_text(self.description_html))
+        self.read_time = read_time(self.word_count)
 
-        # Ensure minimum 1 minute read time
-        return max(minutes, 1)
+    def get_related(self, limit=4):
+        """Return the published projects most similar to this one, from the precomputed `ProjectRelation` index."""
+        return Project.objects.filter(reverse_relations__source=self, is_published=True).only(
+            *self.CARD_FIELDS
+        ).order_by('-reverse_relations__score', '-created_at')[:limit]
 
     def time_since_created(self):
         """Return human-readable time since project was created."""
@@ -128,11 +181,18 @@ class ProjectMedia(models.Model):
     Attributes:
         project (ForeignKey): The project this media belongs to.
         image (ImageField): The media file, typically an image.
+        image_renditions (dict): Names of the resized copies of the image <i>(generated on upload)</i>.
+        image_width, image_height (int): Intrinsic size of the image <i>(computed on upload)</i>.
+        image_placeholder (str): Tiny inline preview of the image <i>(computed on upload)</i>.
         caption (str): Optional caption for the media.
     Provides a string representation of the media in the format "Project Title - Caption".
     """
     project = models.ForeignKey(Project, related_name="media", on_delete=models.CASCADE, help_text="Associated project")
     image = models.ImageField(upload_to="projects/media/")
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default="", editable=False)
     caption = models.CharField(max_length=255, blank=True, null=True, help_text="Optional caption for the media")
 
     class Meta:
@@ -161,7 +221,7 @@ class Tag(models.Model):
         return self.name
 
 
-class Achievement(models.Model):
+class Achievement(RenderedContentMixin, models.Model):
     """
     Represents an achievement with various attributes like title, content, image, tags, and event date.
     Provides methods for calculating time since creation, update, and event date.
@@ -169,7 +229,12 @@ class Achievement(models.Model):
         title (str): The title of the achievement.
         slug (str): A unique URL-friendly identifier for the achievement, auto-generated from the title.
         content (str): A description of the achievement.
+        content_html (str): The sanitized content, ready to output <i>(rendered on save)</i>.
+        excerpt (str): Plain-text excerpt of the content <i>(rendered on save)</i>.
         image (ImageField): An optional image associated with the achievement.
+        image_renditions (dict): Names of the resized copies of the image <i>(generated on upload)</i>.
+        image_width, image_height (int): Intrinsic size of the image <i>(computed on upload)</i>.
+        image_placeholder (str): Tiny inline preview of the image <i>(computed on upload)</i>.
         tags (ManyToManyField): Tags associated with the achievement.
         link (URLField): Optional link for more information about the achievement.
         event_date (DateField): Date of the event related to the achievement, if applicable.
@@ -180,7 +245,13 @@ class Achievement(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
     content = models.TextField(help_text="Achievement description")
+    content_html = models.TextField(blank=True, default="", editable=False)
+    excerpt = models.TextField(blank=True, default="", editable=False, help_text="Plain-text content excerpt")
     image = models.ImageField(upload_to="achievements/", blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default="", editable=False)
     tags = models.ManyToManyField(Tag, blank=True, related_name="achievements")
     link = models.URLField(blank=True, null=True)
     event_date = models.DateField(blank=True, null=True)
@@ -190,6 +261,15 @@ class Achievement(models.Model):
 
     class Meta:
         ordering = ["-created_at", "-event_date"]
+        indexes = [
+            # the public list, by offset or by keyset, only shows published achievements
+            models.Index(
+                fields=["-created_at", "-event_date", "-id"], condition=models.Q(is_published=True),
+                name="achievement_published_idx",
+            ),
+            # conditional GET validators, Max(updated_at) on every page view
+            models.Index(fields=["updated_at"], name="achievement_updated_idx"),
+        ]
 
     def time_since_created(self):
         """Return human-readable time since project was created."""
@@ -199,6 +279,12 @@ class Achievement(models.Model):
         """Return human-readable time since project was last updated."""
         return time_since(self.updated_at)
 
+    def get_related(self, limit=4):
+        """Return the published achievements most similar to this one, from the precomputed `AchievementRelation` index."""
+        return Achievement.objects.filter(reverse_relations__source=self, is_published=True).order_by(
+            '-reverse_relations__score', '-created_at'
+        )[:limit]
+
     def time_since_event(self):
         """Return human-readable time since the event date."""
         if self.event_date:
@@ -214,34 +300,95 @@ class Achievement(models.Model):
         return self.title
 
 
-class Skill(models.Model):
+class ProjectRelation(models.Model):
+    """
+    Represents the similarity of two projects, precomputed by `core.related` from their shared tags, category and type.
+    Each pair is stored in both directions.
+    Attributes:
+        source (ForeignKey): The project the similarity is looked up for.
+        target (ForeignKey): The similar project.
+        score (float): The similarity score, higher is more similar.
+    """
+    source = models.ForeignKey(Project, related_name="relations", on_delete=models.CASCADE)
+    target = models.ForeignKey(Project, related_name="reverse_relations", on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["source", "-score"]
+        constraints = [models.UniqueConstraint(fields=["source", "target"], name="unique_project_relation")]
+        indexes = [models.Index(fields=["source", "-score"], name="project_relation_score_idx")]
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id} ({self.score:.2f})"
+
+
+class AchievementRelation(models.Model):
+    """
+    Represents the similarity of two achievements, precomputed by `core.related` from their shared tags.
+    Each pair is stored in both directions.
+    Attributes:
+        source (ForeignKey): The achievement the similarity is looked up for.
+        target (ForeignKey): The similar achievement.
+        score (float): The similarity score, higher is more similar.
+    """
+    source = models.ForeignKey(Achievement, related_name="relations", on_delete=models.CASCADE)
+    target = models.ForeignKey(Achievement, related_name="reverse_relations", on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["source", "-score"]
+        constraints = [models.UniqueConstraint(fields=["source", "target"], name="unique_achievement_relation")]
+        indexes = [models.Index(fields=["source", "-score"], name="achievement_relation_score_idx")]
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id} ({self.score:.2f})"
+
+
+class Skill(RenderedContentMixin, models.Model):
     """
     Represents a skill with a name and optional description.
     Attributes:
         name (str): The name of the skill, must be unique.
         description (str): Optional description of the skill.
+        description_html (str): The sanitized description, ready to output <i>(rendered on save)</i>.
+        excerpt (str): Plain-text excerpt of the description <i>(rendered on save)</i>.
     Provides a string representation of the skill name.
     Provides ordering by name.
     """
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    description_html = models.TextField(blank=True, default="", editable=False)
+    excerpt = models.TextField(blank=True, default="", editable=False, help_text="Plain-text description excerpt")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True, help_text="Skill last update date")
     is_published = models.BooleanField(default=True, help_text="Is the skill visible on the site?")
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name"], condition=models.Q(is_published=True), name="skill_published_idx"),
+            models.Index(fields=["updated_at"], name="skill_updated_idx"),
+        ]
+
+    CONTENT_FIELD = 'description'
+    RENDERED_FIELDS = ('description_html', 'excerpt')
 
     def __str__(self):
         return self.name
 
 
-class Story(models.Model):
+class Story(RenderedContentMixin, models.Model):
     # Basic Information
     title = models.CharField(max_length=200, help_text="Main story title")
     subtitle = models.CharField(max_length=300, blank=True, help_text="Optional subtitle or tagline")
     content = models.TextField(help_text="Main story content")
+    content_html = models.TextField(blank=True, default="", editable=False)
+    excerpt = models.TextField(blank=True, default="", editable=False, help_text="Plain-text content excerpt")
     image = models.ImageField(upload_to="stories/", blank=True, null=True, help_text="Optional story image")
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default="", editable=False)
 
     # Timeline Information
     period = models.CharField(max_length=100, help_text="Time period (e.g., '2020-2023', 'Early 2024')")
@@ -255,6 +402,9 @@ class Story(models.Model):
         on_delete=models.CASCADE,
         help_text="Optional parent story if this is a sub-topic"
     )
+    # Materialized position in the tree, maintained on save (see core.stories)
+    path = models.CharField(max_length=255, blank=True, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     # Metadata
     is_published = models.BooleanField(default=True, help_text="Publish this story")
@@ -265,6 +415,13 @@ class Story(models.Model):
         ordering = ['-created_at']
         verbose_name = "Story"
         verbose_name_plural = "Stories"
+        indexes = [
+            # the published tree, read in path order on the about page
+            models.Index(fields=["path"], condition=models.Q(is_published=True), name="story_published_path_idx"),
+            # subtrees, read with path__startswith
+            models.Index(fields=["path"], name="story_path_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["updated_at"], name="story_updated_idx"),
+        ]
 
     def __str__(self):
         prefix = "[ Parent ] " if self.is_root else ""
@@ -274,3 +431,47 @@ class Story(models.Model):
     def is_root(self):
         """Check if this is a top-level story (main topic)."""
         return self.parent is None
+
+    def clean(self):
+        if self.parent_id and self.pk:
+            parent_path = Story.objects.filter(pk=self.parent_id).values_list("path", flat=True).first() or ""
+            if self.parent_id == self.pk or (self.path and parent_path.startswith(self.path)):
+                raise ValidationError({"parent": "A story can't be placed under itself or one of its substories."})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_path(self)
+
+
+class SearchDocument(models.Model):
+    """
+    Represents the searchable text of a published project, achievement or story, kept up to date by `core.search`.
+    Attributes:
+        kind (str): The kind of the indexed item.
+        object_id (int): The primary key of the indexed item.
+        title (str): The title of the item.
+        text (str): The plain text of the item, without HTML.
+        url (str): The URL of the page showing the item.
+        search_vector (tsvector): The weighted `tsvector` of the title and text <i>(PostgreSQL only)</i>.
+        updated_at (DateTimeField): When the document was last indexed.
+    """
+
+    class Kind(models.TextChoices):
+        PROJECT = "project", "Project"
+        ACHIEVEMENT = "achievement", "Achievement"
+        STORY = "story", "Story"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=300)
+    text = models.TextField(blank=True, default="")
+    url = models.CharField(max_length=300)
+    # Indexed with GIN on PostgreSQL only, by migration 0019, as SQLite has no such index
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document")]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+# Create your paginators here.
+# Keyset pagination: instead of `OFFSET n`, a page starts right after the sort key of the last row
+# of the previous one, e.g. `WHERE (created_at, id) < (...) ORDER BY created_at DESC, id DESC LIMIT 11`.
+# With an index on the sort key every page costs the same, however deep, and no `COUNT(*)` is needed.
+# The position is handed to the client as an opaque cursor: the sort key and direction, JSON in base64.
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """A page of a `CursorPaginator`, with the cursors of the pages before and after it."""
+
+    def __init__(self, object_list, previous_cursor, next_cursor):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by keyset, following `ordering`, a sequence of field names prefixed with `-` when
+    descending. The fields must identify a row, so the last one is usually `id`.
+    Nulls sort as on PostgreSQL, above any value: last when ascending, first when descending.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.fields = [queryset.model._meta.get_field(name) for name, _ in self.ordering]
+
+    def encode_cursor(self, row, direction) -> str:
+        values = [field.value_to_string(row) if getattr(row, field.attname) is not None else None
+                  for field in self.fields]
+        data = json.dumps({'d': direction, 'v': values}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            direction, values = data['d'], data['v']
+            if direction not in ('next', 'previous') or len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            return direction, [None if value is None else field.to_python(value)
+                               for field, value in zip(self.fields, values)]
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+
+    def order_by(self, reverse=False):
+        expressions = []
+        for (name, descending), field in zip(self.ordering, self.fields):
+            descending = descending != reverse
+            if not field.null:
+                expressions.append(F(name).desc() if descending else F(name).asc())
+            else:
+                expressions.append(F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True))
+        return expressions
+
+    def after(self, values, reverse=False) -> Q:
+        """Return the condition selecting the rows that come after the sort key `values`, in the (reversed) ordering."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), field, value in zip(self.ordering, self.fields, values):
+            descending = descending != reverse
+            if value is None:
+                # Nulls are above any value: followed by all values when descending, by nothing when ascending
+                beyond = Q(**{f'{name}__isnull': False}) if descending else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if field.null and not descending:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def page(self, cursor=None) -> CursorPage:
+        """
+        Return the page starting after `cursor`, the first one if it is empty.
+
+        Raises:
+            InvalidCursor: If the cursor was not issued by this paginator.
+        """
+        if not cursor:
+            direction, values = 'next', None
+        else:
+            direction, values = self.decode_cursor(cursor)
+        reverse = direction == 'previous'
+
+        queryset = self.queryset.order_by(*self.order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.after(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more, rows = len(rows) > self.per_page, rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        has_previous, has_next = (has_more, True) if reverse else (values is not None, has_more)
+        return CursorPage(
+            rows,
+            self.encode_cursor(rows[0], 'previous') if rows and has_previous else None,
+            self.encode_cursor(rows[-1], 'next') if rows and has_next else None,
+        )
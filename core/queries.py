@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+# Create your query inspection here.
+# In development, `core.middleware.QueryInspectorMiddleware` records the queries of every request with the
+# template line or the code that ran them, and reports:
+# - the same SQL run several times, the signature of an N+1 pattern, e.g. `{% if project.tags.exists %}`
+#   in the loop of a list that doesn't prefetch the tags;
+# - queries slower than SLOW_QUERY_MS;
+# - related objects loaded lazily while rendering a template, which the view should have fetched.
+
+DEFAULTS = {'SLOW_QUERY_MS': 100, 'DUPLICATE_THRESHOLD': 2, 'RAISE': False}
+
+# Frames of these files are the inspection itself, not the code that ran the query
+IGNORED_FILES = {
+    os.path.join(os.path.dirname(__file__), name) for name in ('queries.py', 'middleware.py', 'instrumentation.py')
+}
+
+
+class QueryInspectionError(Exception):
+    pass
+
+
+def inspector_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'QUERY_INSPECTOR', {})}
+
+
+@dataclass
+class Query:
+    sql: str
+    params: tuple
+    duration: float
+    template: str = ''
+    code: str = ''
+    lazy: bool = False
+
+    @property
+    def source(self) -> str:
+        return self.template or self.code or 'unknown'
+
+
+def query_source() -> dict:
+    """
+    Return where the running query comes from: the innermost template line being rendered, the innermost frame
+    of the project's code, and whether it lazily loads objects related to an instance, e.g. `project.tags.all`,
+    a foreign key or a deferred field: Django hints the querysets of those with the instance.
+    """
+    source = {'template': '', 'code': '', 'lazy': False}
+    prefetch = False
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        queryset = frame.f_locals.get('self')
+        if isinstance(queryset, QuerySet) and not source['template'] and queryset._hints.get('instance') is not None:
+            source['lazy'] = True
+        elif code.co_name == 'prefetch_related_objects' and not source['template']:
+            # The querysets of prefetches are hinted too, but load the relation of every row at once
+            prefetch = True
+        elif code.co_name == 'render_annotated' and not source['template']:
+            node = frame.f_locals.get('self')
+            token, origin = getattr(node, 'token', None), getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                source['template'] = f'{origin.template_name or origin.name}:{token.lineno}'
+        elif (not source['code'] and filename.startswith(base_dir) and 'site-packages' not in filename
+              and filename not in IGNORED_FILES):
+            source['code'] = f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    source['lazy'] = source['lazy'] and bool(source['template']) and not prefetch
+    return source
+
+
+@dataclass
+class QueryRecorder:
+    """An execute wrapper (see `connection.execute_wrapper()`) keeping the queries of a request and their source."""
+    queries: list = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(Query(sql, tuple(params or ()), time.perf_counter() - start, **query_source()))
+
+    def problems(self, options=None) -> list:
+        """Return the problems found, as `(kind, description, sources)` tuples."""
+        options = options or inspector_settings()
+        problems, by_sql = [], {}
+        for query in self.queries:
+            by_sql.setdefault(query.sql, []).append(query)
+
+        for sql, queries in by_sql.items():
+            if len(queries) >= options['DUPLICATE_THRESHOLD']:
+                # The same query again, or the same one for each row of a list
+                kind = 'duplicate' if len({query.params for query in queries}) == 1 else 'N+1'
+                problems.append((kind, f'{len(queries)}x {sql}', sorted({query.source for query in queries})))
+        for query in self.queries:
+            if query.duration * 1000 >= options['SLOW_QUERY_MS']:
+                problems.append(('slow', f'{query.duration * 1000:.1f} ms {query.sql}', [query.source]))
+            if query.lazy:
+                problems.append(('lazy load', query.sql, [query.template]))
+        return problems
+
+    def report(self, label, options=None) -> str:
+        """Return the problems found as text, empty if there are none."""
+        problems = self.problems(options)
+        if not problems:
+            return ''
+        total = sum(query.duration for query in self.queries) * 1000
+        lines = [f'{label}: {len(self.queries)} queries in {total:.1f} ms, {len(problems)} problems']
+        for kind, description, sources in problems:
+            lines.append(f'  {kind}: {description}')
+            lines += [f'      at {source}' for source in sources]
+        return '\n'.join(lines)
@@ -0,0 +1,103 @@
+import math
+from collections import defaultdict
+from itertools import combinations
+
+from django.db.models import Count, Q
+
+# Create your related content engine here.
+# Items sharing tags are scored pairwise and the scores are stored in a relation table
+# (`ProjectRelation`, `AchievementRelation`), so a detail page reads its top neighbours with one query.
+# A shared tag weighs more the fewer items carry it, and projects get a bonus for sharing
+# the category and the type. The weight of a tag only depends on how many items carry it, so updating
+# the items whose tags changed and those carrying the same tags gives the same index as a rebuild.
+
+PROJECT_BONUSES = {'category': 1.0, 'project_type': 0.5}
+
+
+class RelationIndex:
+    """
+    The similarity index of a tagged model, stored in a relation model with `source`, `target` and `score` fields.
+    Takes the model classes as arguments so that migrations can build it with their historical models.
+    """
+
+    def __init__(self, model, relation_model, bonuses=None):
+        self.model = model
+        self.relation_model = relation_model
+        self.bonuses = bonuses or {}
+        self.through = model._meta.get_field('tags').remote_field.through
+        self.item_field = f'{model._meta.model_name}_id'
+
+    def tag_weights(self, tag_ids=None):
+        """Return the weight of each tag, `1 / log2(1 + df)` where df is the number of items carrying it."""
+        links = self.through._default_manager.all()
+        if tag_ids is not None:
+            links = links.filter(tag_id__in=tag_ids)
+        counts = links.values('tag_id').annotate(count=Count('pk')).values_list('tag_id', 'count')
+        return {tag_id: 1 / math.log2(1 + count) for tag_id, count in counts}
+
+    def bonus(self, first, second):
+        return sum(weight for field, weight in self.bonuses.items() if first[field] == second[field])
+
+    def attributes(self, pks):
+        rows = self.model._default_manager.filter(pk__in=pks).values('pk', *self.bonuses)
+        return {row['pk']: row for row in rows}
+
+    def score(self, links, weights, pks=None):
+        """Score the pairs of items sharing tags in `links`, only those involving `pks` if given."""
+        items_by_tag = defaultdict(list)
+        for pk, tag_id in links:
+            items_by_tag[tag_id].append(pk)
+
+        scores = defaultdict(float)
+        for tag_id, items in items_by_tag.items():
+            for pair in combinations(sorted(items), 2):
+                if pks is None or pair[0] in pks or pair[1] in pks:
+                    scores[pair] += weights[tag_id]
+        if self.bonuses and scores:
+            attributes = self.attributes({pk for pair in scores for pk in pair})
+            for first, second in scores:
+                scores[first, second] += self.bonus(attributes[first], attributes[second])
+        return scores
+
+    def save(self, scores):
+        self.relation_model._default_manager.bulk_create([
+            self.relation_model(source_id=source, target_id=target, score=score)
+            for (first, second), score in scores.items()
+            for source, target in ((first, second), (second, first))
+        ], batch_size=1000)
+
+    def update(self, pks, tag_ids=()):
+        """
+        Recompute the relations of the given items, in both directions, after their tags or attributes changed.
+        `tag_ids` are the tags that were added or removed: their weight changed, so the items still carrying them
+        are recomputed too.
+        """
+        links = self.through._default_manager.values_list(self.item_field, 'tag_id')
+        pks = set(pks) | set(links.filter(tag_id__in=tag_ids).values_list(self.item_field, flat=True))
+        if not pks:
+            return
+        tag_ids = links.filter(**{f'{self.item_field}__in': pks}).values_list('tag_id', flat=True)
+        links = list(links.filter(tag_id__in=tag_ids))
+        scores = self.score(links, self.tag_weights({tag_id for _, tag_id in links}), pks)
+
+        relations = self.relation_model._default_manager
+        relations.filter(Q(source_id__in=pks) | Q(target_id__in=pks)).delete()
+        self.save(scores)
+
+    def rebuild(self):
+        """Recompute the whole index and return the number of related pairs."""
+        scores = self.score(self.through._default_manager.values_list(self.item_field, 'tag_id'), self.tag_weights())
+        relations = self.relation_model._default_manager
+        relations.all().delete()
+        self.save(scores)
+        return len(scores)
+
+
+def project_index():
+    from core.models import Project, ProjectRelation
+    return RelationIndex(Project, ProjectRelation, PROJECT_BONUSES)
+
+
+def achievement_index():
+    from core.models import Achievement, AchievementRelation
+    return RelationIndex(Achievement, AchievementRelation)
@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, DatabaseError
+
+from core.metrics import registry
+
+# Create your database routers here.
+# Reads of the public pages go to the read replicas of REPLICA_DATABASES, the rest to the primary: the admin,
+# background tasks, commands, and any read that follows a write. A request is pinned to the primary once it
+# writes, and so are the requests of the same client for REPLICA_PIN_SECONDS afterwards (see
+# `core.middleware.ReplicaMiddleware`), so that an edit shows up on the page the admin is redirected to.
+# Replicas lagging more than REPLICA_MAX_LAG seconds behind the primary are left out until they catch up.
+# Reads that fill a cache shared by every client go to the primary too, e.g. a page rendered for the page cache:
+# the dependencies of the cache are bumped right after a write commits, when a replica may not have replayed it
+# yet, and what it read would be served to everyone as current.
+
+# Seconds since the last replayed transaction, 0 when the replica has replayed everything it received
+LAG_SQL = {
+    'postgresql': (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+replica_lag = registry.gauge(
+    'jolio_db_replica_lag_seconds', 'Replication lag of the read replicas, when last measured.', ['alias']
+)
+
+# Per request: whether its reads may go to a replica, and whether it wrote since
+replica_state = ContextVar('replica_state', default=None)
+
+_lags = {}
+_lags_lock = threading.Lock()
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads made in the block to the replicas, until a write pins them to the primary."""
+    state = {'replicas': True, 'wrote': False}
+    token = replica_state.set(state)
+    try:
+        yield state
+    finally:
+        replica_state.reset(token)
+
+
+def read_from_primary():
+    """Send the remaining reads of the current request to the primary, e.g. once it renders a page to cache."""
+    state = replica_state.get()
+    if state is not None:
+        state['replicas'] = False
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads made in the block to the primary, e.g. those filling a cache shared by every client."""
+    state = replica_state.get()
+    if state is None:
+        yield
+        return
+    replicas = state['replicas']
+    state['replicas'] = False
+    try:
+        yield
+    finally:
+        state['replicas'] = replicas
+
+
+def measure_lag(alias: str) -> float:
+    """Return the replication lag of a replica in seconds, infinite when it can't be reached."""
+    connection = connections[alias]
+    sql = LAG_SQL.get(connection.vendor)
+    if sql is None:
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return float('inf')
+
+
+def get_lag(alias: str) -> float:
+    """Return the lag of a replica, measured at most every REPLICA_LAG_CHECK_INTERVAL seconds per process."""
+    now = time.monotonic()
+    with _lags_lock:
+        checked_at, lag = _lags.get(alias, (None, None))
+    if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+        lag = measure_lag(alias)
+        replica_lag.set(lag, alias=alias)
+        with _lags_lock:
+            _lags[alias] = (now, lag)
+    return lag
+
+
+def clear_lags():
+    with _lags_lock:
+        _lags.clear()
+
+
+def available_replicas() -> list:
+    return [alias for alias in settings.REPLICA_DATABASES if get_lag(alias) <= settings.REPLICA_MAX_LAG]
+
+
+class ReplicaRouter:
+    """Route the reads of public requests to a random replica that is up to date enough."""
+
+    def db_for_read(self, model, **hints):
+        state = replica_state.get()
+        if state is None or not state['replicas'] or state['wrote'] or not settings.REPLICA_DATABASES:
+            return None
+        replicas = available_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = replica_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,357 @@
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from core.cache import get_cache
+from core.utils import html_to_text
+
+# Create your search engine here.
+# Every published project, achievement and story has a `SearchDocument` holding its plain text, refreshed
+# when it is saved. On PostgreSQL the documents are matched through a weighted `tsvector` column with a GIN
+# index; on other databases (SQLite in development) an inverted index of the documents is built in memory,
+# once per process and again whenever the documents change, and ranked with BM25.
+
+SEARCH_VERSION_KEY = 'core:search:version'
+
+# Highlight markers, replaced by <mark> once the snippet is escaped
+MARK_START, MARK_END = '\x02', '\x03'
+
+SNIPPET_WORDS = 30
+MAX_TERMS = 10
+
+# Weight of a title occurrence compared to one in the text, and of a prefix match compared to the whole word
+TITLE_WEIGHT = 3
+PREFIX_WEIGHT = 0.5
+
+# Incomplete words are only expanded from this length on, to this many indexed words
+PREFIX_MIN_LENGTH = 3
+PREFIX_LIMIT = 20
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def search_config():
+    """Return the PostgreSQL text search configuration, `SEARCH_CONFIG` (`english` if unset)."""
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def tokenize(text: str) -> list:
+    """Split a text into lowercase word tokens."""
+    return re.findall(r'\w+', text.casefold())
+
+
+def search_vector():
+    """Return the expression computing the `search_vector` of a document, its title weighing more than its text."""
+    return (SearchVector('title', weight='A', config=search_config())
+            + SearchVector('text', weight='B', config=search_config()))
+
+
+def uses_postgres() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+# Documents
+
+def document_values(instance) -> dict:
+    """
+    Return the title, plain text and URL of the search document of a project, achievement or story.
+    Only reads fields, so that migrations can call it with historical models.
+    """
+    kind = instance._meta.model_name
+    if kind == 'project':
+        parts = [instance.client_name, html_to_text(instance.description)]
+        url = reverse('core:project_detail', args=[instance.pk, instance.slug])
+    elif kind == 'achievement':
+        parts = [html_to_text(instance.content)]
+        url = f"{reverse('core:achievements')}#achievement-{instance.pk}"
+    else:
+        parts = [instance.subtitle, instance.period, html_to_text(instance.content)]
+        url = f"{reverse('core:about')}#{'story' if instance.parent_id is None else 'sub'}-{instance.pk}"
+    if kind in ('project', 'achievement'):
+        parts.extend(instance.tags.values_list('name', flat=True))
+    return {'title': instance.title, 'text': ' '.join(part for part in parts if part), 'url': url}
+
+
+def is_searchable(instance) -> bool:
+    """Return whether an item is shown on the site: published, and for a sub-story, under published stories only."""
+    if not instance.is_published:
+        return False
+    if instance._meta.model_name == 'story':
+        parent = instance.parent
+        while parent is not None:
+            if not parent.is_published:
+                return False
+            parent = parent.parent
+    return True
+
+
+def changed_on_commit():
+    """Make the in-memory indexes of every process stale once the current transaction is committed."""
+    transaction.on_commit(lambda: get_cache().set(SEARCH_VERSION_KEY, uuid4().hex, None))
+
+
+def index_instance(instance):
+    """Create, refresh or remove the search document of a project, achievement or story after it changed."""
+    from core.models import SearchDocument
+
+    kind = instance._meta.model_name
+    if not is_searchable(instance):
+        SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+    else:
+        document, _ = SearchDocument.objects.update_or_create(
+            kind=kind, object_id=instance.pk, defaults=document_values(instance)
+        )
+        if uses_postgres():
+            SearchDocument.objects.filter(pk=document.pk).update(search_vector=search_vector())
+    changed_on_commit()
+
+
+def unindex_instance(instance):
+    """Remove the search document of a deleted project, achievement or story."""
+    from core.models import SearchDocument
+
+    SearchDocument.objects.filter(kind=instance._meta.model_name, object_id=instance.pk).delete()
+    changed_on_commit()
+
+
+def rebuild_documents(models, document_model) -> int:
+    """
+    Replace all the search documents with those of the published rows of `models`.
+    Takes the model classes as arguments so that migrations can run it with their historical models.
+
+    Returns:
+        int: The number of documents.
+    """
+    documents = [
+        document_model(kind=model._meta.model_name, object_id=instance.pk, **document_values(instance))
+        for model in models
+        for instance in model._default_manager.filter(is_published=True).iterator()
+        if is_searchable(instance)
+    ]
+    document_model._default_manager.all().delete()
+    document_model._default_manager.bulk_create(documents, batch_size=500)
+    if uses_postgres():
+        document_model._default_manager.update(search_vector=search_vector())
+    changed_on_commit()
+    return len(documents)
+
+
+# Results
+
+def render_snippet(marked: str):
+    """Escape a snippet and turn its highlight markers into <mark> elements."""
+    return mark_safe(escape(marked).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def highlight(text: str, terms) -> str:
+    """Return the words of `text` around the first match of one of `terms`, with the matches marked."""
+    words = text.split()
+    matches = [i for i, word in enumerate(words) if any(token.startswith(terms) for token in tokenize(word))]
+    start = max(matches[0] - SNIPPET_WORDS // 3, 0) if matches else 0
+    window = words[start:start + SNIPPET_WORDS]
+    pattern = re.compile(r'\b(?:%s)\w*' % '|'.join(map(re.escape, terms)), re.IGNORECASE)
+    snippet = pattern.sub(lambda match: f'{MARK_START}{match.group()}{MARK_END}', ' '.join(window))
+    return f"{'… ' if start else ''}{snippet}{' …' if start + SNIPPET_WORDS < len(words) else ''}"
+
+
+class SearchResults(ABC):
+    """
+    The ranked `SearchDocument`s matching a query, fetched a page at a time as `Paginator` slices them.
+    Each document gets a `rank` and a highlighted `snippet`.
+    """
+
+    @abstractmethod
+    def __len__(self):
+        """Return the number of matching documents."""
+
+    @abstractmethod
+    def fetch(self, page: slice) -> list:
+        """Return the documents of a slice of the results, best ranked first."""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.fetch(index)
+        return self.fetch(slice(index, index + 1))[0]
+
+    def __iter__(self):
+        return iter(self.fetch(slice(None)))
+
+
+class PostgresResults(SearchResults):
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.queryset.count()
+        return self._count
+
+    def fetch(self, page):
+        documents = list(self.queryset[page])
+        for document in documents:
+            document.snippet = render_snippet(document.headline)
+        return documents
+
+
+class MemoryResults(SearchResults):
+
+    def __init__(self, ranked, terms):
+        self.ranked = ranked
+        self.terms = terms
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def fetch(self, page):
+        from core.models import SearchDocument
+
+        ranked = self.ranked[page]
+        documents = SearchDocument.objects.defer('search_vector').in_bulk([pk for pk, _ in ranked])
+        results = []
+        for pk, rank in ranked:
+            document = documents.get(pk)
+            if document is not None:  # deleted since the index was built
+                document.rank = rank
+                document.snippet = render_snippet(highlight(document.text, self.terms))
+                results.append(document)
+        return results
+
+
+# In-memory index
+
+class MemoryIndex:
+    """
+    An inverted index of search documents, mapping each token to its BM25 term weight in each document.
+    The weights only lack the inverse document frequency of the token, applied at query time.
+    """
+
+    def __init__(self, rows):
+        counts_by_pk = {}
+        self.kinds = {}
+        for pk, kind, title, text in rows:
+            counts = Counter(tokenize(text))
+            for token in tokenize(title):
+                counts[token] += TITLE_WEIGHT
+            counts_by_pk[pk] = counts
+            self.kinds[pk] = kind
+
+        lengths = {pk: sum(counts.values()) for pk, counts in counts_by_pk.items()}
+        average_length = sum(lengths.values()) / len(lengths) if lengths else 1
+        self.postings = defaultdict(dict)
+        for pk, counts in counts_by_pk.items():
+            norm = K1 * (1 - B + B * lengths[pk] / average_length)
+            for token, count in counts.items():
+                self.postings[token][pk] = count * (K1 + 1) / (count + norm)
+        self.total = len(counts_by_pk)
+        self.vocabulary = sorted(self.postings)
+
+    def expand(self, term):
+        """Return the token `term` and, if it is long enough to be meaningful, up to PREFIX_LIMIT tokens it begins."""
+        tokens = [term] if term in self.postings else []
+        if len(term) >= PREFIX_MIN_LENGTH:
+            start = bisect_left(self.vocabulary, term)
+            for token in self.vocabulary[start:start + PREFIX_LIMIT + 1]:
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    tokens.append(token)
+        return tokens[:PREFIX_LIMIT]
+
+    def search(self, terms, kind=None) -> list:
+        """Return the `(pk, score)` of the documents matching all `terms`, best first."""
+        scores = None
+        # Start from the rarest term, so that the candidates shrink as fast as possible
+        for term in sorted(terms, key=lambda term: len(self.postings.get(term, ())) or self.total):
+            term_scores = defaultdict(float)
+            for token in self.expand(term):
+                postings = self.postings[token]
+                idf = math.log(1 + (self.total - len(postings) + 0.5) / (len(postings) + 0.5))
+                if token != term:
+                    idf *= PREFIX_WEIGHT
+                if scores is None:
+                    for pk, weight in postings.items():
+                        term_scores[pk] += idf * weight
+                else:
+                    for pk in scores.keys() & postings.keys():
+                        term_scores[pk] += idf * postings[pk]
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+            if not scores:
+                return []
+        if kind:
+            scores = {pk: score for pk, score in scores.items() if self.kinds[pk] == kind}
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+_memory_index = (None, None)
+_memory_index_lock = threading.Lock()
+
+
+def get_memory_index() -> MemoryIndex:
+    """Return the in-memory index of this process, rebuilding it if the documents changed since it was built."""
+    from core.models import SearchDocument
+
+    global _memory_index
+    cache = get_cache()
+    version = cache.get(SEARCH_VERSION_KEY)
+    if version is None:
+        cache.add(SEARCH_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(SEARCH_VERSION_KEY)
+    if _memory_index[0] != version:
+        with _memory_index_lock:
+            if _memory_index[0] != version:
+                rows = SearchDocument.objects.values_list('pk', 'kind', 'title', 'text')
+                _memory_index = (version, MemoryIndex(rows.iterator()))
+    return _memory_index[1]
+
+
+def search(query: str, kind: str = None) -> SearchResults:
+    """
+    Search the published projects, achievements and stories.
+
+    Args:
+        query (str): The words to look for, all of which must match. The last ones may be incomplete
+            in development; PostgreSQL also understands quoted phrases, `or` and `-excluded` words.
+        kind (str): Only return documents of this kind, e.g. `project`.
+
+    Returns:
+        SearchResults: The matching documents, best first.
+    """
+    from core.models import SearchDocument
+
+    terms = tuple(dict.fromkeys(tokenize(query)))[:MAX_TERMS]
+    if not terms:
+        return MemoryResults([], terms)
+
+    if uses_postgres():
+        search_query = SearchQuery(query, search_type='websearch', config=search_config())
+        queryset = SearchDocument.objects.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            headline=SearchHeadline(
+                'text', search_query, config=search_config(), start_sel=MARK_START, stop_sel=MARK_END,
+                max_words=SNIPPET_WORDS, min_words=SNIPPET_WORDS // 2,
+            ),
+        ).defer('search_vector').order_by('-rank', 'pk')
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        return PostgresResults(queryset)
+
+    return MemoryResults(get_memory_index().search(terms, kind), terms)
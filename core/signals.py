@@ -0,0 +1,273 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.cache import invalidate_availability, invalidate_pages
+from core.images import get_renditions, process_image
+from core.models import Update, Project, Tag, ProjectMedia, Achievement, Skill, Story
+from core.related import project_index, achievement_index
+from core.search import index_instance, unindex_instance
+from core.sitemaps import segment_dependency
+from core.tasks import enqueue
+
+
+# Create your signals here.
+
+def invalidate_pages_on_commit(*dependencies):
+    """Make the pages rendered from `dependencies` stale once the current transaction is committed."""
+    transaction.on_commit(lambda: invalidate_pages(*dependencies))
+
+
+def remember_values(instance, fields):
+    """Keep the stored values of `fields` on the instance, to tell after saving whether they changed."""
+    if instance._state.adding or instance.pk is None:
+        instance._stored_values = None
+    else:
+        instance._stored_values = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def touch(model, pks):
+    """Bump `updated_at` of the given rows, whose pages changed through a related model."""
+    if pks:
+        model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+        invalidate_pages_on_commit(*lastmod_dependencies(model, pks))
+
+
+def lastmod_dependencies(model, pks) -> list:
+    """Return the dependencies of the sitemap and feeds, which show `updated_at`, to bump when rows change."""
+    dependencies = [f'{model._meta.model_name}-lastmod']
+    if model is Project:
+        dependencies.extend({segment_dependency(pk) for pk in pks})
+    return dependencies
+
+
+def changed(instance, fields):
+    """Return whether the instance is new or one of `fields` differs from what `remember_values()` stored."""
+    stored = getattr(instance, '_stored_values', None)
+    return stored is None or any(stored[field] != getattr(instance, field) for field in fields)
+
+
+# Availability flag, shown on every page
+
+@receiver([post_save, post_delete], sender=Update)
+def update_changed(sender, **kwargs):
+    """Invalidate the cached availability flag once the admin save, delete or bulk delete is committed."""
+    transaction.on_commit(invalidate_availability)
+    invalidate_pages_on_commit('update')
+
+
+# Projects
+
+PROJECT_LISTING_FIELDS = ('is_published', 'created_at')
+PROJECT_RELATION_FIELDS = ('category', 'project_type')
+
+
+@receiver(pre_save, sender=Project)
+def project_saving(sender, instance, **kwargs):
+    remember_values(instance, PROJECT_LISTING_FIELDS + PROJECT_RELATION_FIELDS)
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, **kwargs):
+    dependencies = [f'project:{instance.pk}']
+    if changed(instance, PROJECT_LISTING_FIELDS):
+        dependencies.append('projects')
+    if changed(instance, PROJECT_RELATION_FIELDS):
+        dependencies.append('project-relations')
+        if not kwargs.get('raw'):
+            project_index().update([instance.pk])
+    invalidate_pages_on_commit(*dependencies)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    invalidate_pages_on_commit(f'project:{instance.pk}', 'projects', 'project-relations')
+
+
+@receiver(post_save, sender=ProjectMedia)
+@receiver(post_delete, sender=ProjectMedia)
+def project_media_changed(sender, instance, **kwargs):
+    touch(Project, [instance.project_id])
+    invalidate_pages_on_commit(f'project:{instance.project_id}')
+
+
+# Achievements
+
+ACHIEVEMENT_LISTING_FIELDS = ('is_published', 'created_at', 'event_date')
+
+
+@receiver(pre_save, sender=Achievement)
+def achievement_saving(sender, instance, **kwargs):
+    remember_values(instance, ACHIEVEMENT_LISTING_FIELDS)
+
+
+@receiver(post_save, sender=Achievement)
+def achievement_saved(sender, instance, **kwargs):
+    dependencies = [f'achievement:{instance.pk}']
+    if changed(instance, ACHIEVEMENT_LISTING_FIELDS):
+        dependencies.append('achievements')
+    invalidate_pages_on_commit(*dependencies)
+
+
+@receiver(post_delete, sender=Achievement)
+def achievement_deleted(sender, instance, **kwargs):
+    invalidate_pages_on_commit(f'achievement:{instance.pk}', 'achievements')
+
+
+# Tags, rendered on the pages of the projects and achievements they are attached to
+
+def tagged_changed(tag, *extra):
+    """Touch the projects and achievements tagged with `tag`, make their pages stale and return their pks."""
+    project_pks = list(tag.projects.values_list('pk', flat=True))
+    achievement_pks = list(tag.achievements.values_list('pk', flat=True))
+    touch(Project, project_pks)
+    touch(Achievement, achievement_pks)
+    invalidate_pages_on_commit(
+        *extra, *(f'project:{pk}' for pk in project_pks), *(f'achievement:{pk}' for pk in achievement_pks)
+    )
+    return project_pks, achievement_pks
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        project_pks, achievement_pks = tagged_changed(instance)
+        reindex(Project, project_pks)
+        reindex(Achievement, achievement_pks)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # The m2m rows are removed by the cascade without m2m_changed, so collect them beforehand
+    instance._tagged_pks = tagged_changed(instance, 'project-relations')
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    project_pks, achievement_pks = instance.__dict__.pop('_tagged_pks', ((), ()))
+    project_index().update(project_pks)
+    achievement_index().update(achievement_pks)
+    reindex(Project, project_pks)
+    reindex(Achievement, achievement_pks)
+
+
+def tags_changed(instance, action, reverse, model, pk_set, prefix, index, extra=()):
+    """Handle `m2m_changed` of a `tags` relation, `prefix` naming the dependency of the tagged model."""
+    if action == 'pre_clear':
+        # pk_set is None when clearing, so collect the rows on the other side before they are removed
+        if reverse:
+            related = getattr(instance, model._meta.get_field('tags').related_query_name())
+        else:
+            related = instance.tags
+        instance._cleared_pks = set(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_pks', set())
+    if reverse:
+        pks, tag_ids = pk_set, {instance.pk}
+    else:
+        pks, tag_ids = {instance.pk}, pk_set
+    touch(model, pks)
+    # The weights of the added or removed tags changed, so the other items carrying them are updated too
+    index.update(pks, tag_ids)
+    reindex(model, pks)
+    invalidate_pages_on_commit(*extra, *(f'{prefix}:{pk}' for pk in pks))
+
+
+@receiver(m2m_changed, sender=Project.tags.through)
+def project_tags_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    tags_changed(instance, action, reverse, Project, pk_set, 'project', project_index(), extra=['project-relations'])
+
+
+@receiver(m2m_changed, sender=Achievement.tags.through)
+def achievement_tags_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    tags_changed(instance, action, reverse, Achievement, pk_set, 'achievement', achievement_index())
+
+
+# Search documents, holding the text and the tag names of the published items
+
+def reindex(model, pks):
+    """Refresh the search documents of the given rows, whose tags changed."""
+    for instance in model.objects.filter(pk__in=pks):
+        index_instance(instance)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Achievement)
+@receiver(post_save, sender=Story)
+def searchable_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_instance(instance)
+    if sender is Story and instance.path:
+        # Sub-stories are only shown under published stories, at any depth
+        for substory in Story.objects.filter(path__startswith=instance.path).exclude(pk=instance.pk):
+            index_instance(substory)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Achievement)
+@receiver(post_delete, sender=Story)
+def searchable_deleted(sender, instance, **kwargs):
+    unindex_instance(instance)
+
+
+# About and home page content
+
+@receiver([post_save, post_delete], sender=Skill)
+def skill_changed(sender, **kwargs):
+    invalidate_pages_on_commit('skills')
+
+
+@receiver([post_save, post_delete], sender=Story)
+def story_changed(sender, **kwargs):
+    invalidate_pages_on_commit('stories')
+
+
+# Sitemap and feeds
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Achievement)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Story)
+def lastmod_changed(sender, instance, **kwargs):
+    invalidate_pages_on_commit(*lastmod_dependencies(sender, [instance.pk]))
+
+
+# Uploaded images, resized to renditions in the background
+
+IMAGE_FIELDS = {
+    Project: ('cover_image',),
+    ProjectMedia: ('image',),
+    Achievement: ('image',),
+    Story: ('image',),
+}
+
+
+def invalidate_instance_pages(instance):
+    """Make the pages showing a project, project media, achievement or story stale."""
+    if isinstance(instance, Project):
+        invalidate_pages_on_commit(f'project:{instance.pk}')
+    elif isinstance(instance, ProjectMedia):
+        invalidate_pages_on_commit(f'project:{instance.project_id}')
+    elif isinstance(instance, Achievement):
+        invalidate_pages_on_commit(f'achievement:{instance.pk}')
+    elif isinstance(instance, Story):
+        invalidate_pages_on_commit('stories')
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectMedia)
+@receiver(post_save, sender=Achievement)
+@receiver(post_save, sender=Story)
+def image_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for field_name in IMAGE_FIELDS[sender]:
+        field_file = getattr(instance, field_name)
+        if field_file and not get_renditions(field_file):
+            enqueue(process_image, sender._meta.label, instance.pk, field_name)
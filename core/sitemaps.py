@@ -0,0 +1,133 @@
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Max
+from django.urls import reverse
+
+from core.cache import get_versioned, set_versioned
+from core.routers import primary_reads
+
+# Create your sitemap here.
+# The sitemap is assembled from cached parts instead of being queried on every crawl: the list pages with
+# the latest `updated_at` of their tables, and the published projects in segments of SEGMENT_SIZE primary keys.
+# Each part is invalidated through the page cache dependencies, so saving a project only rebuilds its segment,
+# from the primary.
+# Past SITEMAP_LIMIT URLs the parts are spread over several files listed by a sitemap index.
+
+# Maximum number of URLs of a sitemap file, set by the sitemap protocol
+SITEMAP_LIMIT = 50000
+SEGMENT_SIZE = 1000
+
+STATIC_KEY = 'core:sitemap:static'
+LAYOUT_KEY = 'core:sitemap:layout'
+SEGMENT_KEY = 'core:sitemap:projects:{}'
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_START = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_END = '</urlset>\n'
+INDEX_START = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_END = '</sitemapindex>\n'
+
+
+def sitemap_limit() -> int:
+    return getattr(settings, 'SITEMAP_LIMIT', SITEMAP_LIMIT)
+
+
+def segment_dependency(pk: int) -> str:
+    """Return the name of the dependency of the sitemap segment holding a project, e.g. `sitemap:projects:3`."""
+    return f'sitemap:projects:{pk // SEGMENT_SIZE}'
+
+
+def static_entries() -> list:
+    """Return the `(path, lastmod)` of the pages that aren't projects, the lists showing their latest row."""
+    from core.models import Project, Achievement, Skill, Story
+
+    entries = get_versioned(STATIC_KEY)
+    if entries is None:
+        with primary_reads():
+            latest = {
+                model: model.objects.aggregate(updated_at=Max('updated_at'))['updated_at']
+                for model in (Project, Achievement, Skill, Story)
+            }
+        home = [value for value in (latest[Project], latest[Skill]) if value is not None]
+        entries = [
+            (reverse('core:home'), max(home) if home else None),
+            (reverse('core:projects'), latest[Project]),
+            (reverse('core:achievements'), latest[Achievement]),
+            (reverse('core:about'), latest[Story]),
+        ]
+        set_versioned(STATIC_KEY, entries, ['project-lastmod', 'achievement-lastmod', 'skill-lastmod', 'story-lastmod'])
+    return entries
+
+
+def project_segment(index: int) -> list:
+    """Return the `(path, lastmod)` of the published projects whose primary key falls in segment `index`."""
+    from core.models import Project
+
+    key = SEGMENT_KEY.format(index)
+    entries = get_versioned(key)
+    if entries is None:
+        with primary_reads():
+            rows = list(Project.objects.filter(
+                is_published=True, pk__gte=index * SEGMENT_SIZE, pk__lt=(index + 1) * SEGMENT_SIZE
+            ).order_by('pk').values_list('pk', 'slug', 'updated_at'))
+        entries = [(reverse('core:project_detail', args=[pk, slug]), updated_at) for pk, slug, updated_at in rows]
+        set_versioned(key, entries, [segment_dependency(index * SEGMENT_SIZE)])
+    return entries
+
+
+def segment_counts() -> dict:
+    """Return the number of published projects per non-empty segment, refreshed when projects are (un)published."""
+    from core.models import Project
+
+    counts = get_versioned(LAYOUT_KEY)
+    if counts is None:
+        rows = Project.objects.filter(is_published=True).values_list('pk', flat=True)
+        counts = {}
+        with primary_reads():
+            for pk in rows.iterator():
+                counts[pk // SEGMENT_SIZE] = counts.get(pk // SEGMENT_SIZE, 0) + 1
+        set_versioned(LAYOUT_KEY, counts, ['projects'])
+    return counts
+
+
+def sitemap_files() -> list:
+    """
+    Spread the parts of the sitemap over files of at most `SITEMAP_LIMIT` URLs.
+
+    Returns:
+        list: Per file, its parts: `static` or the index of a project segment.
+    """
+    limit = sitemap_limit()
+    files, current, size = [], ['static'], len(static_entries())
+    for index, count in sorted(segment_counts().items()):
+        if size + count > limit and current:
+            files.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += count
+    files.append(current)
+    return files
+
+
+def url_element(location: str, lastmod) -> str:
+    lastmod = f'<lastmod>{lastmod.isoformat(timespec="seconds")}</lastmod>' if lastmod else ''
+    return f'<url><loc>{escape(location)}</loc>{lastmod}</url>\n'
+
+
+def stream_urlset(request, parts):
+    """Yield the XML of a sitemap file a part at a time, so no more than a segment is held in memory."""
+    yield XML_HEADER + URLSET_START
+    for part in parts:
+        entries = static_entries() if part == 'static' else project_segment(part)
+        yield ''.join(url_element(request.build_absolute_uri(path), lastmod) for path, lastmod in entries)
+    yield URLSET_END
+
+
+def stream_index(request, count: int):
+    """Yield the XML of the sitemap index listing `count` sitemap files."""
+    yield XML_HEADER + INDEX_START
+    for number in range(1, count + 1):
+        location = request.build_absolute_uri(reverse('core:sitemap_section', args=[number]))
+        yield f'<sitemap><loc>{escape(location)}</loc></sitemap>\n'
+    yield INDEX_END
@@ -0,0 +1,330 @@
+import hashlib
+import mimetypes
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import HashedFilesMixin, ManifestFilesMixin, StaticFilesStorage
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from boto3.s3.transfer import TransferConfig
+from PIL import Image, ImageOps, features
+from storages.backends.s3 import S3StaticStorage
+from storages.utils import clean_name
+from whitenoise.compress import Compressor
+
+from core.images import RENDITION_FORMATS, webp_name
+
+# Create your storages here.
+# In production the static files are served from the S3 bucket, with nothing in front to compress or cache them.
+# `StaticStorage` gives them what WhiteNoise gives them in development:
+# - names fingerprinted with their content hash, through the manifest of `ManifestFilesMixin`;
+# - `Cache-Control: immutable` on the fingerprinted files, which never change under the same name;
+# - precompressed `.br` and `.gz` siblings of the text files, e.g. `core/css/styles.1a2b3c4d5e6f.css.br`,
+#   for a CDN or proxy to pick from the `Accept-Encoding` of the request;
+# - a WebP version of the PNG and JPEG images, listed in the manifest under the name of the original
+#   with a `.webp` extension, e.g. `core/images/pfp.webp`, see `{% static_image %}`.
+# `collectstatic` lists the bucket once instead of asking for each file, doesn't upload the files whose content
+# is already there, and hashes, compresses and uploads in parallel. The manifest is uploaded last, once every
+# file it lists is in the bucket.
+# `LocalStaticStorage` collects the same files to STATIC_ROOT, for `sync_static` to upload through `StaticStorage`.
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unhashed copies, e.g. the admin scripts loading each other by name
+CACHE_CONTROL = 'public, max-age=3600'
+MANIFEST_CACHE_CONTROL = 'no-cache'
+
+WEBP_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+# Most keys a DeleteObjects request takes
+DELETE_BATCH_SIZE = 1000
+
+
+def encode_webp(data: bytes) -> bytes:
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, RENDITION_FORMATS['webp']['pillow'], **RENDITION_FORMATS['webp']['options'])
+    return buffer.getvalue()
+
+
+def upload_etag(chunks, size: int, config: TransferConfig) -> str:
+    """
+    Return the ETag S3 gives an object uploaded with `config`.
+
+    Args:
+        chunks (Iterable[bytes]): The content of the object, in chunks of `config.multipart_chunksize` bytes.
+        size (int): The size of the object in bytes.
+        config (TransferConfig): The transfer configuration it is uploaded with.
+
+    Returns:
+        str: The MD5 of its content, or for an object uploaded in parts, the MD5 of the MD5s of its parts
+        followed by their number, e.g. `...-2`.
+    """
+    digests = [hashlib.md5(chunk, usedforsecurity=False).digest() for chunk in chunks]
+    if size < config.multipart_threshold:
+        return digests[0].hex() if digests else hashlib.md5(usedforsecurity=False).hexdigest()
+    return f'{hashlib.md5(b"".join(digests), usedforsecurity=False).hexdigest()}-{len(digests)}'
+
+
+class StaticVariantsMixin(ManifestFilesMixin):
+    """
+    Adds the precompressed siblings of the text files and the WebP versions of the images to the files collected
+    by a manifest storage, which stores each of them with `save_variant()`.
+    """
+
+    def save_variant(self, name: str, data: bytes):
+        raise NotImplementedError('subclasses of StaticVariantsMixin must provide a save_variant() method')
+
+    def submit(self, function, *args):
+        function(*args)
+
+    def wait(self):
+        pass
+
+    def read(self, name: str) -> bytes:
+        """Return the content of a fingerprinted file."""
+        with self.open(name) as file:
+            return file.read()
+
+    def save_compressed(self, name: str, encodings: dict):
+        """Save the compressed siblings of `name`, those that are smaller than it by 5% at least."""
+        compressor, data = Compressor(quiet=True), self.read(name)
+        for suffix, encoding in encodings.items():
+            compressed = compressor.compress_brotli(data) if encoding == 'br' else compressor.compress_gzip(data)
+            if not compressor.is_compressed_effectively(encoding, name, len(data), compressed):
+                # Gzip is not effective either where Brotli isn't
+                break
+            self.save_variant(name + suffix, compressed)
+
+    def save_webp(self, name: str, webp: str):
+        self.save_variant(webp, encode_webp(self.read(name)))
+
+    def save_manifest(self):
+        compressor = Compressor(quiet=True)
+        encodings = {
+            suffix: encoding for suffix, encoding in ENCODINGS.items() if encoding != 'br' or compressor.use_brotli
+        }
+        webp = features.check('webp')
+        # The fingerprinted files of the previous manifest got their siblings then, or weren't worth compressing
+        previous = set(self.load_manifest()[0].values())
+        for name, hashed_name in list(self.hashed_files.items()):
+            if (
+                    compressor.should_compress(hashed_name)
+                    and hashed_name not in previous
+                    and not self.exists(hashed_name + '.gz')
+            ):
+                self.submit(self.save_compressed, hashed_name, encodings)
+            if webp and name.lower().endswith(WEBP_EXTENSIONS) and webp_name(name) not in self.hashed_files:
+                self.hashed_files[webp_name(name)] = webp_name(hashed_name)
+                if not self.exists(webp_name(hashed_name)):
+                    self.submit(self.save_webp, hashed_name, webp_name(hashed_name))
+
+        # Every file the manifest lists is saved before it is replaced
+        self.wait()
+        super().save_manifest()
+
+
+class LocalStaticStorage(StaticVariantsMixin, StaticFilesStorage):
+    """The static files collected to STATIC_ROOT as `StaticStorage` uploads them, e.g. for `sync_static`."""
+
+    def save_variant(self, name: str, data: bytes):
+        self.delete(name)
+        self._save(name, ContentFile(data))
+
+
+class StaticStorage(StaticVariantsMixin, S3StaticStorage):
+    """
+    The S3 storage of the static files, fingerprinted, precompressed and uploaded in parallel by `collectstatic`.
+    `workers` sets the number of threads hashing, compressing and uploading files.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Keys of the bucket with their (ETag, last modified), listed by the first `exists()` of a collectstatic
+        self.listing = None
+        self.pending_deletes = set()
+        self.executor = None
+        self.futures = []
+        self.hashing = False
+        self.hashes = {}
+        # Content of the fingerprinted files uploaded by this run, which the variants are made from
+        self.contents = {}
+        super().__init__(*args, **kwargs)
+
+    def get_default_settings(self):
+        return {**super().get_default_settings(), 'workers': 8}
+
+    def key(self, name: str) -> str:
+        return self._normalize_name(clean_name(name))
+
+    def load_listing(self) -> dict:
+        if self.listing is None:
+            location = self.location.strip('/')
+            listing = {}
+            paginator = self.connection.meta.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f'{location}/' if location else ''):
+                for entry in page.get('Contents', ()):
+                    listing[entry['Key']] = (entry['ETag'].strip('"'), entry['LastModified'])
+            self.listing = listing
+        return self.listing
+
+    def exists(self, name):
+        key = self.key(name)
+        return key in self.load_listing() and key not in self.pending_deletes
+
+    def get_modified_time(self, name):
+        entry = self.load_listing().get(self.key(name))
+        if entry is None:
+            return super().get_modified_time(name)
+        return entry[1] if settings.USE_TZ else timezone.make_naive(entry[1])
+
+    def delete(self, name):
+        if self.listing is None:
+            return super().delete(name)
+        # collectstatic deletes a file before copying it again, while an upload replaces it anyway:
+        # the delete only happens if the file isn't saved again by the end of the run
+        key = self.key(name)
+        if key in self.listing:
+            self.pending_deletes.add(key)
+
+    def delete_keys(self, keys: list):
+        """Delete keys of the bucket, as many per request as S3 takes."""
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            self.connection.meta.client.delete_objects(Bucket=self.bucket_name, Delete={
+                'Objects': [{'Key': key} for key in keys[start:start + DELETE_BATCH_SIZE]],
+            })
+
+    @contextmanager
+    def parallel(self):
+        """Run the functions submitted meanwhile on `workers` threads, yielding their executor."""
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            yield self.executor
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor, self.futures = None, []
+
+    def submit(self, function, *args):
+        if self.executor is None:
+            function(*args)
+        else:
+            self.futures.append(self.executor.submit(function, *args))
+
+    def wait(self):
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+
+    def get_upload_parameters(self, name: str, immutable: bool) -> dict:
+        """
+        Return the headers a static file is uploaded with.
+
+        Args:
+            name (str): The name of the file, e.g. `core/css/styles.1a2b3c4d5e6f.css.br`.
+            immutable (bool): Whether the file never changes under this name, e.g. a fingerprinted file.
+
+        Returns:
+            dict: Its type, its encoding for a compressed sibling and its caching.
+        """
+        root, extension = posixpath.splitext(name)
+        encoding = ENCODINGS.get(extension)
+        params = self.get_object_parameters(self.key(name))
+        content_type = mimetypes.guess_type(root if encoding else name)[0]
+        params.setdefault('ContentType', content_type or self.default_content_type)
+        if encoding:
+            params['ContentEncoding'] = encoding
+        if 'ACL' not in params and self.default_acl:
+            params['ACL'] = self.default_acl
+        if name == self.manifest_name:
+            params['CacheControl'] = MANIFEST_CACHE_CONTROL
+        elif immutable:
+            params['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            params.setdefault('CacheControl', CACHE_CONTROL)
+        return params
+
+    def etag(self, data: bytes) -> str:
+        """Return the ETag of `data` once uploaded by `upload()` (see `upload_etag()`)."""
+        config = self.transfer_config or TransferConfig()
+        size = config.multipart_chunksize
+        return upload_etag((data[start:start + size] for start in range(0, len(data), size)), len(data), config)
+
+    def upload(self, key: str, data: bytes, params: dict):
+        # Each thread gets a client of its own from `connection`, with its own pool of HTTP connections
+        self.connection.meta.client.upload_fileobj(
+            BytesIO(data), self.bucket_name, key, ExtraArgs=params, Config=self.transfer_config
+        )
+
+    def _save(self, name, content):
+        cleaned_name = clean_name(name)
+        key = self._normalize_name(cleaned_name)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        data = content.read()
+        data = data.encode() if isinstance(data, str) else data
+        if self.hashing:
+            self.contents[cleaned_name] = data
+
+        self.pending_deletes.discard(key)
+        etag = self.etag(data)
+        if self.listing is not None:
+            if self.listing.get(key, (None,))[0] == etag:
+                return cleaned_name
+            self.listing[key] = (etag, timezone.now())
+
+        self.submit(self.upload, key, data, self.get_upload_parameters(cleaned_name, self.hashing))
+        return cleaned_name
+
+    def save_variant(self, name: str, data: bytes):
+        self.upload(self.key(name), data, self.get_upload_parameters(name, immutable=True))
+
+    def read(self, name: str) -> bytes:
+        """Return the content of a fingerprinted file, from this run or from the bucket."""
+        if name in self.contents:
+            return self.contents[name]
+        return self.connection.meta.client.get_object(Bucket=self.bucket_name, Key=self.key(name))['Body'].read()
+
+    def file_hash(self, name, content=None):
+        if name in self.hashes:
+            return self.hashes[name]
+        return super().file_hash(name, content)
+
+    def hashed_name(self, name, content=None, filename=None):
+        # The files referenced by a stylesheet are hashed already, rather than downloaded from the bucket again
+        if content is None and urlsplit(unquote(name)).path.strip() in self.hashes:
+            content = ContentFile(b'')
+        return super().hashed_name(name, content, filename)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+
+        with self.parallel() as executor:
+            try:
+                def hash_file(name):
+                    storage, path = paths[name]
+                    with storage.open(path) as file:
+                        return HashedFilesMixin.file_hash(self, name, file)
+
+                # The files that reference others are hashed after their references are replaced
+                names = [name for name in paths if not matches_patterns(name, self._patterns)]
+                self.hashes = dict(zip(names, executor.map(hash_file, names)))
+
+                self.hashing = True
+                yield from super().post_process(paths, dry_run, **options)
+            finally:
+                self.hashing = False
+                self.hashes, self.contents = {}, {}
+
+    def save_manifest(self):
+        self.hashing = False
+        super().save_manifest()
+        self.wait()
+        self.delete_keys(sorted(self.pending_deletes))
+        self.pending_deletes = set()
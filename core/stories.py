@@ -0,0 +1,103 @@
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+# Create your story tree helpers here.
+# Stories form a tree through `parent`. Each story also stores its materialized `path`, the zero-padded
+# ids of its ancestors and its own, e.g. `00000003/00000012/`, and its `depth`, so that the whole
+# published tree is read with one query ordered by path, and a subtree with `path__startswith`.
+
+PATH_DIGITS = 8
+
+# Fallback for stories without a path yet, on PostgreSQL and SQLite alike: published stories reachable
+# from a published root through published parents
+PUBLISHED_TREE_SQL = """
+WITH RECURSIVE tree (id) AS (
+    SELECT id FROM {table} WHERE parent_id IS NULL AND is_published = %s
+    UNION ALL
+    SELECT story.id FROM {table} story INNER JOIN tree ON story.parent_id = tree.id WHERE story.is_published = %s
+)
+SELECT * FROM {table} WHERE id IN (SELECT id FROM tree)
+"""
+
+
+def path_segment(pk: int) -> str:
+    return f'{pk:0{PATH_DIGITS}d}/'
+
+
+def update_path(story):
+    """
+    Store the path and depth of a saved story from those of its parent, and rewrite those of its
+    descendants if it moved, each in a single UPDATE.
+    """
+    model = type(story)
+    parent_path = ''
+    if story.parent_id:
+        parent_path = model._default_manager.filter(pk=story.parent_id).values_list('path', flat=True).get()
+    path = parent_path + path_segment(story.pk)
+    depth = path.count('/') - 1
+    if path == story.path and depth == story.depth:
+        return
+
+    old_path, old_depth = story.path, story.depth
+    model._default_manager.filter(pk=story.pk).update(path=path, depth=depth)
+    if old_path:
+        model._default_manager.filter(path__startswith=old_path).exclude(pk=story.pk).update(
+            path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+            depth=F('depth') + (depth - old_depth),
+        )
+    story.path, story.depth = path, depth
+
+
+def rebuild_paths(model) -> int:
+    """
+    Recompute the path and depth of every story, level by level from the roots.
+    Takes the model class as argument so that migrations can run it with their historical model.
+    """
+    stories = list(model._default_manager.only('pk', 'parent_id', 'path', 'depth'))
+    children = {}
+    for story in stories:
+        children.setdefault(story.parent_id, []).append(story)
+
+    level, parent_paths = children.get(None, []), {None: ''}
+    while level:
+        for story in level:
+            story.path = parent_paths[story.parent_id] + path_segment(story.pk)
+            story.depth = story.path.count('/') - 1
+            parent_paths[story.pk] = story.path
+        level = [child for story in level for child in children.get(story.pk, [])]
+    model._default_manager.bulk_update(stories, ['path', 'depth'], batch_size=500)
+    return len(stories)
+
+
+def build_tree(stories) -> list:
+    """
+    Link published stories into a tree, in `published_substories`, and return the roots, newest first.
+    Substories are oldest first. Stories whose parent is missing, i.e. unpublished, are left out with their subtree.
+    """
+    by_pk = {story.pk: story for story in stories}
+    roots = []
+    for story in stories:
+        story.published_substories = []
+    for story in stories:
+        if story.parent_id is None:
+            roots.append(story)
+        elif story.parent_id in by_pk:
+            by_pk[story.parent_id].published_substories.append(story)
+
+    for story in stories:
+        story.published_substories.sort(key=lambda substory: substory.created_at)
+    roots.sort(key=lambda root: root.created_at, reverse=True)
+    return roots
+
+
+def published_story_tree() -> list:
+    """
+    Return the published root stories with their published substories at any depth, read with one query.
+    Falls back to a recursive query if some stories have no path yet.
+    """
+    from core.models import Story
+
+    stories = list(Story.objects.filter(is_published=True).defer('content').order_by('path'))
+    if any(not story.path for story in stories):
+        stories = list(Story.objects.raw(PUBLISHED_TREE_SQL.format(table=Story._meta.db_table), [True, True]))
+    return build_tree(stories)
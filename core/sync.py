@@ -0,0 +1,128 @@
+import json
+import os
+from pathlib import Path
+
+from boto3.s3.transfer import TransferConfig
+
+from core.storage import ENCODINGS, StaticStorage, upload_etag
+
+# Create your static sync here.
+# `collectstatic` against the bucket reads every source file and uploads the changed ones as it goes.
+# `sync_static` instead mirrors a local collectstatic output, e.g. STATIC_ROOT collected by `LocalStaticStorage`,
+# to the bucket of a `StaticStorage`, which lists the bucket, uploads the files and deletes the keys:
+# - a local manifest keeps the size, modification time and expected ETag of every file, so only the files
+#   touched since the last sync are read and hashed again;
+# - a file is uploaded when its key is missing from the listing or holds another ETag.
+# The staticfiles manifest is uploaded last, once every file it lists is in the bucket.
+
+SYNC_MANIFEST_NAME = '.sync-manifest.json'
+
+
+class SyncError(Exception):
+    pass
+
+
+def file_etag(path: Path, config: TransferConfig) -> str:
+    """Return the ETag S3 gives a file uploaded with `config` (see `upload_etag()`), read a part at a time."""
+    with open(path, 'rb') as file:
+        return upload_etag(iter(lambda: file.read(config.multipart_chunksize), b''), path.stat().st_size, config)
+
+
+def read_manifest(path: Path) -> dict:
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text()).get('files', {})
+
+
+def local_files(storage: StaticStorage, source: Path, previous: dict) -> dict:
+    """
+    Return the `size`, `mtime` and `etag` of every file under `source`, by name relative to it.
+    Files whose size and modification time match `previous` keep their ETag rather than being read again.
+    """
+    files = {}
+    for root, _, names in os.walk(source):
+        for filename in names:
+            path = Path(root) / filename
+            name = path.relative_to(source).as_posix()
+            if name == SYNC_MANIFEST_NAME:
+                continue
+            stat = path.stat()
+            files[name] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    stale = []
+    for name, entry in files.items():
+        known = previous.get(name, {})
+        if 'etag' in known and (known.get('size'), known.get('mtime')) == (entry['size'], entry['mtime']):
+            entry['etag'] = known['etag']
+        else:
+            stale.append(name)
+    config = storage.transfer_config or TransferConfig()
+    with storage.parallel() as executor:
+        for name, etag in zip(stale, executor.map(lambda name: file_etag(source / name, config), stale)):
+            files[name]['etag'] = etag
+    return files
+
+
+def immutable_names(source: Path, manifest_name: str) -> set:
+    """Return the fingerprinted names listed by the staticfiles manifest of `source`, if any."""
+    path = source / manifest_name
+    if not path.is_file():
+        return set()
+    return set(json.loads(path.read_text()).get('paths', {}).values())
+
+
+def sync_static(storage: StaticStorage, source, delete: bool = False, dry_run: bool = False,
+                log=lambda message: None) -> dict:
+    """
+    Upload the files of `source` that differ from the bucket of `storage`.
+
+    Args:
+        storage (StaticStorage): The storage of the bucket, uploading `workers` files at once.
+        source (Path): The collected static files, e.g. STATIC_ROOT.
+        delete (bool): Also delete the keys under the location of `storage` that aren't files of `source` anymore.
+        dry_run (bool): Only report what would be uploaded and deleted.
+        log (callable): Called with a line per file uploaded or deleted.
+
+    Returns:
+        dict: The number of files `uploaded`, `unchanged` and `deleted`.
+
+    Raises:
+        SyncError: If `source` is not a directory.
+    """
+    source = Path(source)
+    if not source.is_dir():
+        raise SyncError(f"{source} is not a directory, run collectstatic first.")
+    manifest_path = source / SYNC_MANIFEST_NAME
+
+    files = local_files(storage, source, read_manifest(manifest_path))
+    listing = storage.load_listing()
+    keys = {name: storage.key(name) for name in files}
+    changed = sorted(name for name, entry in files.items() if listing.get(keys[name], (None,))[0] != entry['etag'])
+    removed = sorted(set(listing) - set(keys.values())) if delete else []
+    counts = {'uploaded': len(changed), 'unchanged': len(files) - len(changed), 'deleted': len(removed)}
+
+    if not dry_run:
+        hashed = immutable_names(source, storage.manifest_name)
+
+        def upload(name):
+            root, extension = os.path.splitext(name)
+            immutable = name in hashed or (extension in ENCODINGS and root in hashed)
+            data = (source / name).read_bytes()
+            storage.upload(storage.key(name), data, storage.get_upload_parameters(name, immutable))
+            log(f"uploaded {name}")
+
+        # Pages keep linking to the files of the previous manifest until every new file is in the bucket
+        with storage.parallel():
+            for name in changed:
+                if name != storage.manifest_name:
+                    storage.submit(upload, name)
+            storage.wait()
+        if storage.manifest_name in changed:
+            upload(storage.manifest_name)
+
+        storage.delete_keys(removed)
+        for key in removed:
+            log(f"deleted {key}")
+
+        manifest_path.write_text(json.dumps({'files': files}, indent=2, sort_keys=True))
+    return counts
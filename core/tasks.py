@@ -0,0 +1,46 @@
+import atexit
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Create your tasks here.
+# A minimal background runner: tasks are submitted to a thread pool once the transaction that
+# scheduled them is committed, so that admin requests don't wait for them. The tasks only take
+# serializable arguments, so they can be handed to a real queue (Celery, RQ, ...) without changes.
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'TASKS_MAX_WORKERS', 2), thread_name_prefix='jolio-task'
+        )
+        atexit.register(_executor.shutdown, wait=True)
+    return _executor
+
+
+def run(func, *args):
+    """Run a task, closing the database connections its thread opened afterwards."""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Task %s%r failed", func.__name__, args)
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args):
+    """
+    Run `func(*args)` in the background once the current transaction is committed,
+    or in the calling thread when `TASKS_ALWAYS_EAGER` is set (e.g. in tests and scripts).
+    """
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        transaction.on_commit(lambda: func(*args))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(run, func, *args))
@@ -0,0 +1,23 @@
+from django import template
+
+from core.components import render_component, render_icon
+
+register = template.Library()
+
+
+@register.simple_tag
+def component(template_name, **values):
+    """
+    Render a static component of `templates/components/` from its precompiled fragments.
+    Usage: {% component 'components/tag-chip.html' label=tag.name %}
+    """
+    return render_component(template_name, **values)
+
+
+@register.simple_tag
+def icon(name, attributes=''):
+    """
+    Render an icon of `templates/components/icons/` with the classes of its <svg>.
+    Usage: {% icon 'community' 'size-4' %}
+    """
+    return render_icon(name, attributes)
@@ -1,6 +1,8 @@
 from django import template
 from datetime import datetime
 
+from core.utils import time_since as format_time_since, annotate_time_since
+
 register = template.Library()
 
 @register.filter
@@ -15,4 +17,14 @@ def month_year_short(date):
     """Returns abbreviated month and year from a date object"""
     if not date:
         return ''
-    return date.strftime("%b %Y")
\ No newline at end of file
+    return date.strftime("%b %Y")
+
+@register.filter
+def time_since(date):
+    """Returns how long ago a date was, e.g. "3 days ago", counted from the start of the request"""
+    return format_time_since(date)
+
+@register.filter
+def with_time_since(objects, field):
+    """Returns the objects with the time since their `field` set as `<field>_since`, e.g. `project.created_at_since`"""
+    return annotate_time_since(objects, field)
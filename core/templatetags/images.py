@@ -0,0 +1,69 @@
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.images import RENDITION_FORMATS, get_renditions, webp_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, sizes='100vw', **attributes):
+    """
+    Render an uploaded image as a <picture> offering its AVIF/WebP renditions through `srcset`,
+    with its intrinsic width/height and its placeholder as background, so the layout is reserved
+    and something is painted while it loads.
+    Falls back to a plain <img> of the original until the image is processed.
+    Extra keyword arguments become attributes of the <img>, e.g. `alt`, `class` or `loading`.
+    Usage: {% responsive_image project.cover_image sizes="(min-width: 1024px) 50vw, 100vw" alt=project.title %}
+    """
+    if not field_file:
+        return ''
+
+    renditions = get_renditions(field_file)
+    if not renditions:
+        return format_html('<img src="{}"{}>', field_file.url, flatatt(attributes))
+
+    instance, field_name = field_file.instance, field_file.field.name
+    intrinsic_width = getattr(instance, f'{field_name}_width', None)
+    intrinsic_height = getattr(instance, f'{field_name}_height', None)
+    placeholder = getattr(instance, f'{field_name}_placeholder', '')
+    if intrinsic_width and intrinsic_height:
+        attributes.setdefault('width', intrinsic_width)
+        attributes.setdefault('height', intrinsic_height)
+    if placeholder:
+        style = f'background: url("{placeholder}") center / cover no-repeat'
+        attributes['style'] = f'{attributes["style"].rstrip("; ")}; {style}' if attributes.get('style') else style
+    img = format_html('<img src="{}"{}>', field_file.url, flatatt(attributes))
+
+    storage = field_file.storage
+    # In order of preference, as jsonb columns don't keep the order of keys
+    sources = format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', (
+        (
+            options['mime'],
+            ', '.join(f'{storage.url(name)} {width}w' for width, name in renditions['formats'][fmt].items()),
+            sizes,
+        )
+        for fmt, options in RENDITION_FORMATS.items() if fmt in renditions['formats']
+    ))
+    # display: contents keeps the <img> laid out as if it were a direct child of the parent
+    return format_html('<picture style="display: contents">{}{}</picture>', sources, img)
+
+
+@register.simple_tag
+def static_image(path, **attributes):
+    """
+    Render a static image as a <picture> offering its WebP version when the static storage made one,
+    see core.storage, or as a plain <img>.
+    Extra keyword arguments become attributes of the <img>, e.g. `alt` or `class`.
+    Usage: {% static_image 'core/images/pfp.jpg' alt="face" class="size-8 rounded-full" %}
+    """
+    img = format_html('<img src="{}"{}>', static(path), flatatt(attributes))
+    webp = webp_name(path)
+    if path == webp or webp not in getattr(staticfiles_storage, 'hashed_files', {}):
+        return img
+    return format_html(
+        '<picture style="display: contents"><source type="image/webp" srcset="{}">{}</picture>', static(webp), img
+    )
@@ -1,20 +1,38 @@
+from django.conf import settings
 from django.urls import path
+from .feeds import ProjectsFeed, AtomProjectsFeed, AchievementsFeed, AtomAchievementsFeed
 from .views import *
 
 # Create your urls here.
 
 app_name = 'core'
 
+if settings.ASYNC_VIEWS:
+    HomeView, ProjectsView, ProjectDetailView, AchievementsView, AboutView = (
+        AsyncHomeView, AsyncProjectsView, AsyncProjectDetailView, AsyncAchievementsView, AsyncAboutView
+    )
+
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
 
     # Projects URLs
     path('dids/', ProjectsView.as_view(), name='projects'),
     path('dids/<int:pk>/<slug:slug>/', ProjectDetailView.as_view(), name='project_detail'),
+    path('dids/feed/', ProjectsFeed(), name='projects_feed'),
+    path('dids/feed/atom/', AtomProjectsFeed(), name='projects_atom_feed'),
 
     # Achievements URLs
     path('diaries/', AchievementsView.as_view(), name='achievements'),
+    path('diaries/feed/', AchievementsFeed(), name='achievements_feed'),
+    path('diaries/feed/atom/', AtomAchievementsFeed(), name='achievements_atom_feed'),
 
     # About
     path('journey/', AboutView.as_view(), name='about'),
+
+    # Sitemap
+    path('sitemap.xml', sitemap, name='sitemap'),
+    path('sitemap-<int:number>.xml', sitemap_section, name='sitemap_section'),
+
+    # Search
+    path('search/', SearchView.as_view(), name='search'),
 ]
\ No newline at end of file
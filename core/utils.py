@@ -1,5 +1,11 @@
-from datetime import datetime, timedelta
+import re
+from bisect import bisect_right
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+from html import unescape
+
 from django.utils import timezone
+from django.utils.html import strip_tags
 
 
 def date_formatter(date: datetime) -> str:
@@ -54,57 +60,214 @@ def datetime_formatter(date_time: datetime) -> str:
     return f"{date_formatter(date_time)} at {time_formatter(date_time)}"
 
 
-def time_since(date):
+# The "now" of the request being served, set by `core.middleware.RequestNowMiddleware`, so that the relative times
+# of a page are computed from a single clock read
+request_now = ContextVar('request_now', default=None)
+# When the relative times computed by the request being served change, see `TimeSinceChanges`
+time_since_changes = ContextVar('time_since_changes', default=None)
+
+# Relative time buckets: from how many seconds ago they apply, their unit in seconds and their name
+TIME_SINCE_BUCKETS = (
+    (60, 60, 'minute'),
+    (60 * 60, 60 * 60, 'hour'),
+    (24 * 60 * 60, 24 * 60 * 60, 'day'),
+    (7 * 24 * 60 * 60, 7 * 24 * 60 * 60, 'week'),
+    (30 * 24 * 60 * 60, 30 * 24 * 60 * 60, 'month'),
+    (365 * 24 * 60 * 60, 365 * 24 * 60 * 60, 'year'),
+)
+TIME_SINCE_THRESHOLDS = [threshold for threshold, _, _ in TIME_SINCE_BUCKETS]
+ONE_SECOND = timedelta(seconds=1)
+
+
+def current_now() -> datetime:
+    """Return the time the current request started at, or the current time outside of requests."""
+    return request_now.get() or timezone.now()
+
+
+def seconds_since(date, now: datetime):
+    """Return the whole seconds elapsed since a date or datetime (rounded down), None for no date."""
+    if not date:
+        return None
+    if isinstance(date, datetime):
+        if date.tzinfo is None:
+            date = timezone.make_aware(date)
+        return (now - date) // ONE_SECOND
+    # Dates count whole days
+    return (now.date() - date).days * 24 * 60 * 60
+
+
+def format_time_since(seconds) -> str:
+    if seconds is None:
+        return "Unknown"
+    if seconds < 0:
+        return "In the future"
+    index = bisect_right(TIME_SINCE_THRESHOLDS, seconds) - 1
+    if index < 0:
+        return "Just now"
+    _, unit, name = TIME_SINCE_BUCKETS[index]
+    count = seconds // unit
+    return f"{count} {name}{'s' if count != 1 else ''} ago"
+
+
+def seconds_until_change(seconds: int) -> int:
+    """Return in how many seconds the relative time of something `seconds` old changes, e.g. to "1 minute ago"."""
+    if seconds < 0:
+        return -seconds
+    index = bisect_right(TIME_SINCE_THRESHOLDS, seconds) - 1
+    if index < 0:
+        return TIME_SINCE_THRESHOLDS[0] - seconds
+    unit = TIME_SINCE_BUCKETS[index][1]
+    change = (seconds // unit + 1) * unit
+    if index + 1 < len(TIME_SINCE_THRESHOLDS):
+        change = min(change, TIME_SINCE_THRESHOLDS[index + 1])
+    return change - seconds
+
+
+class TimeSinceChanges:
+    """
+    The earliest time one of the relative times computed during a request changes, set by
+    `core.middleware.RequestNowMiddleware`, so that the page cache only keeps a page while its text holds.
+    """
+
+    def __init__(self):
+        self.at = None
+
+    def add(self, dates, seconds, now: datetime):
+        for date, age in zip(dates, seconds):
+            if age is None:
+                continue
+            if isinstance(date, datetime):
+                at = now + timedelta(seconds=seconds_until_change(age))
+            else:
+                # Dates count whole days, from the day of `now`
+                at = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+            if self.at is None or at < self.at:
+                self.at = at
+
+
+def time_since_changes_at():
+    """Return when the first relative time computed by the request being served changes, None if there is none."""
+    changes = time_since_changes.get()
+    return changes.at if changes is not None else None
+
+
+def time_since(date, now: datetime = None) -> str:
     """
     Calculate human-readable time since a given date.
     Returns a string like "2 days ago", "1 hour ago", etc.
+
+    Args:
+        date (date | datetime): The date, naive datetimes being in the current time zone.
+        now (datetime): The time to count from, `current_now()` by default.
+
+    Returns:
+        str: The relative time, "Unknown" for no date and "In the future" for a later one.
     """
-    if not date:
-        return "Unknown"
+    now = now or current_now()
+    seconds = seconds_since(date, now)
+    changes = time_since_changes.get()
+    if changes is not None:
+        changes.add((date,), (seconds,), now)
+    return format_time_since(seconds)
 
-    # Ensure we're working with timezone-aware datetime
-    if isinstance(date, datetime):
-        now = timezone.now()
-        if timezone.is_naive(date):
-            date = timezone.make_aware(date)
-    else:
-        # If it's a date object, convert to datetime at start of day
-        now = timezone.now().date()
-        date = date
 
-    # Calculate the difference
-    if isinstance(date, datetime):
-        diff = now - date
-    else:
-        diff = now - date
-        # Convert to timedelta for consistent handling
-        diff = timedelta(days=diff.days)
-
-    # Handle future dates
-    if diff.total_seconds() < 0:
-        return "In the future"
+def time_since_many(dates, now: datetime = None) -> list:
+    """
+    Calculate the human-readable time since each of a sequence of dates, from a single "now".
 
-    # Calculate time units
-    seconds = int(diff.total_seconds())
-    minutes = seconds // 60
-    hours = minutes // 60
-    days = diff.days
-    weeks = days // 7
-    months = days // 30
-    years = days // 365
-
-    # Return appropriate time string with pluralization
-    if years > 0:
-        return f"{years} year{'s' if years != 1 else ''} ago"
-    elif months > 0:
-        return f"{months} month{'s' if months != 1 else ''} ago"
-    elif weeks > 0:
-        return f"{weeks} week{'s' if weeks != 1 else ''} ago"
-    elif days > 0:
-        return f"{days} day{'s' if days != 1 else ''} ago"
-    elif hours > 0:
-        return f"{hours} hour{'s' if hours != 1 else ''} ago"
-    elif minutes > 0:
-        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
-    else:
-        return "Just now"
+    Args:
+        dates (Iterable[date | datetime]): The dates, e.g. `queryset.values_list('created_at', flat=True)`.
+        now (datetime): The time to count from, `current_now()` by default.
+
+    Returns:
+        list: The relative times, in the order of the dates.
+    """
+    now = now or current_now()
+    dates = list(dates)
+    seconds = [seconds_since(date, now) for date in dates]
+    changes = time_since_changes.get()
+    if changes is not None:
+        changes.add(dates, seconds, now)
+    return [format_time_since(age) for age in seconds]
+
+
+def annotate_time_since(objects, field: str, attribute: str = None) -> list:
+    """
+    Set the time since a date field on each of a list of objects, e.g. a page of projects.
+
+    Args:
+        objects (Iterable[Model]): The objects, a queryset being evaluated.
+        field (str): The date field, e.g. `created_at`.
+        attribute (str): The attribute set on each object, `<field>_since` by default.
+
+    Returns:
+        list: The objects.
+    """
+    objects = list(objects)
+    attribute = attribute or f'{field}_since'
+    for item, text in zip(objects, time_since_many(getattr(item, field) for item in objects)):
+        setattr(item, attribute, text)
+    return objects
+
+
+# Average reading speed (words per minute)
+# 200-250 is typical for adults, using 200 for conservative estimate
+READING_WPM = 200
+
+
+def html_to_text(html: str) -> str:
+    """
+    Strip HTML tags and entities from a string and collapse whitespace.
+
+    Args:
+        html (str): The HTML content, as produced by the WYSIWYG editor.
+
+    Returns:
+        str: The plain text, on a single line.
+    """
+    if not html:
+        return ''
+    return re.sub(r'\s+', ' ', unescape(strip_tags(html))).strip()
+
+
+def count_words(text: str) -> int:
+    """
+    Count the words in a plain text string.
+
+    Args:
+        text (str): The plain text to count.
+
+    Returns:
+        int: The number of words.
+    """
+    return len(re.findall(r'\b\w+\b', text))
+
+
+def read_time(word_count: int, wpm: int = READING_WPM) -> int:
+    """
+    Calculate the estimated read time in minutes for a number of words, rounded up with a minimum of 1 minute.
+
+    Args:
+        word_count (int): The number of words to read.
+        wpm (int): The reading speed in words per minute.
+
+    Returns:
+        int: The read time in minutes.
+    """
+    return max((word_count + wpm - 1) // wpm, 1)
+
+
+def excerpt(text: str, length: int = 300) -> str:
+    """
+    Truncate a plain text string on a word boundary, appending an ellipsis when it was cut.
+
+    Args:
+        text (str): The plain text to truncate.
+        length (int): The maximum number of characters to keep.
+
+    Returns:
+        str: The truncated text.
+    """
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
@@ -1,94 +1,234 @@
-from django.db.models import Prefetch
+from django.conf import settings
+from django.db.models import Prefetch, Max
+from django.http import HttpResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 from django.views.generic import TemplateView, ListView, DetailView
-from .models import Project, Achievement, Skill, Story
-from .mixins import CommonContextMixin
+from .cache import get_dependency_versions
+from .models import Project, ProjectMedia, Achievement, Skill, Story, Tag, SearchDocument
+from .metrics import registry
+from .mixins import CommonContextMixin, PageCacheMixin, ConditionalGetMixin, CursorPaginationMixin, AsyncViewMixin
+from .search import search
+from .sitemaps import sitemap_files, stream_index, stream_urlset
+from .stories import published_story_tree
 
 
 # Create your views here.
 
-class HomeView(TemplateView, CommonContextMixin):
+def card_tags():
+    """Prefetch for the tag chips on cards, loading only the columns they render."""
+    return Prefetch('tags', queryset=Tag.objects.only('id', 'name'))
+
+
+def table_validators(model, dependency):
+    """
+    Return the latest `updated_at` of a model's table, read from its index, and the version of `dependency`,
+    which `core.signals` bumps when one of its rows is deleted.
+    Unpublished rows are included, so that (un)publishing one changes the result.
+    """
+    return [model.objects.aggregate(updated_at=Max('updated_at'))['updated_at'], *get_dependency_versions(dependency)]
+
+
+class HomeView(PageCacheMixin, ConditionalGetMixin, TemplateView, CommonContextMixin):
     template_name = 'core/index.html'
 
+    def get_validator_values(self):
+        return (
+            super().get_validator_values() + table_validators(Project, 'projects') + table_validators(Skill, 'skills')
+        )
+
+    def get_context_queries(self):
+        return {
+            **super().get_context_queries(),
+            # Latest project and the 4 featured ones after it, in a single query (the cards show no tags)
+            'recent_projects': Project.objects.filter(is_published=True).only(
+                *Project.CARD_FIELDS
+            ).order_by('-created_at')[:5],
+            'skills': Skill.objects.filter(is_published=True).order_by('name'),
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        latest_project = Project.objects.filter(is_published=True).order_by('-created_at').first()
-        context['latest_project'] = latest_project
-
-        # Exclude the latest project from featured projects
-        featured_projects_queryset = Project.objects.filter(is_published=True).order_by('-created_at')
-        if latest_project:
-            featured_projects_queryset = featured_projects_queryset.exclude(id=latest_project.id)
-        context['featured_projects'] = featured_projects_queryset[:4]
-        context['skills'] = Skill.objects.all().filter(is_published=True).order_by('name')
+        projects = context.pop('recent_projects')
+        context['latest_project'] = projects[0] if projects else None
+        context['featured_projects'] = projects[1:]
         return context
 
+    def get_page_dependencies(self, context):
+        projects = [context['latest_project'], *context['featured_projects']] if context['latest_project'] else []
+        return super().get_page_dependencies(context) + ['projects', 'skills'] + [
+            f'project:{project.pk}' for project in projects
+        ]
+
 
-class ProjectsView(ListView, CommonContextMixin):
+class ProjectsView(PageCacheMixin, ConditionalGetMixin, CursorPaginationMixin, ListView, CommonContextMixin):
     template_name = 'core/projects/projects.html'
     model = Project
     context_object_name = 'projects'
     paginate_by = 10
     ordering = ['-created_at']
+    cursor_ordering = ['-created_at', '-id']
+
+    def get_validator_values(self):
+        return super().get_validator_values() + table_validators(Project, 'projects')
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().only(*Project.CARD_FIELDS).prefetch_related(card_tags())
         return queryset.filter(is_published=True)
 
+    def get_page_dependencies(self, context):
+        return super().get_page_dependencies(context) + ['projects'] + [
+            f'project:{project.pk}' for project in context['projects']
+        ]
 
-class ProjectDetailView(DetailView, CommonContextMixin):
+
+class ProjectDetailView(PageCacheMixin, ConditionalGetMixin, DetailView, CommonContextMixin):
     template_name = 'core/projects/project_details.html'
     model = Project
     context_object_name = 'project'
 
-    def get_queryset(self):
-        return super().get_queryset().prefetch_related('media', 'tags')
+    def get_validator_values(self):
+        pk = self.kwargs['pk']
+        # The related projects are shown too, with the titles and covers they have now
+        row = Project.objects.filter(pk=pk).annotate(
+            related_updated_at=Max('relations__target__updated_at')
+        ).values_list('updated_at', 'related_updated_at').first()
+        if row is None:
+            return None
+        # Bumped with the media, the tags and the relation index, whose rows have no `updated_at`
+        versions = get_dependency_versions(f'project:{pk}', 'project-relations')
+        return super().get_validator_values() + list(row) + versions
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        project = self.object
-
-        # Use the related_name from your models
-        context['media'] = project.media.all()
-        context['tags'] = project.tags.all()
-        context['related_projects'] = Project.objects.filter(tags__in=project.tags.all(),
-                                                             category=project.category).exclude(
-            id=project.id).distinct()[:4]
-        return context
-
-
-class AchievementsView(ListView, CommonContextMixin):
+    def get_queryset(self):
+        # The description is output from its rendered copy
+        return super().get_queryset().defer('description')
+
+    def get_context_queries(self):
+        # Read by primary key, so that they don't wait for the project itself
+        project = Project(pk=self.kwargs['pk'])
+        return {
+            **super().get_context_queries(),
+            'media': ProjectMedia.objects.filter(project=project),
+            'tags': Tag.objects.filter(projects=project),
+            'related_projects': project.get_related(),
+        }
+
+    def get_page_dependencies(self, context):
+        return super().get_page_dependencies(context) + ['project-relations', f'project:{self.object.pk}'] + [
+            f'project:{project.pk}' for project in context['related_projects']
+        ]
+
+
+class AchievementsView(PageCacheMixin, ConditionalGetMixin, CursorPaginationMixin, ListView, CommonContextMixin):
     template_name = 'core/achievements.html'
     model = Achievement
     context_object_name = 'achievements'
     paginate_by = 10
     ordering = ['-created_at', '-event_date']
+    cursor_ordering = ['-created_at', '-event_date', '-id']
+
+    def get_validator_values(self):
+        return super().get_validator_values() + table_validators(Achievement, 'achievements')
 
     def get_queryset(self):
-        queryset = super().get_queryset().prefetch_related('tags')
+        # The content is output from its rendered copy
+        queryset = super().get_queryset().defer('content').prefetch_related(card_tags())
         return queryset.filter(is_published=True)
 
+    def get_page_dependencies(self, context):
+        return super().get_page_dependencies(context) + ['achievements'] + [
+            f'achievement:{achievement.pk}' for achievement in context['achievements']
+        ]
 
-class AboutView(TemplateView, CommonContextMixin):
+
+class AboutView(PageCacheMixin, ConditionalGetMixin, TemplateView, CommonContextMixin):
     template_name = 'core/about.html'
 
+    def get_validator_values(self):
+        return super().get_validator_values() + table_validators(Story, 'stories')
+
+    def get_context_queries(self):
+        # The published stories at any depth, linked into `published_substories`, in one query
+        return {**super().get_context_queries(), 'stories': published_story_tree}
+
+    def get_page_dependencies(self, context):
+        return super().get_page_dependencies(context) + ['stories']
+
+
+# Async variants of the public views, served when ASYNC_VIEWS is set (see AsyncViewMixin)
+class AsyncHomeView(AsyncViewMixin, HomeView):
+    pass
+
+
+class AsyncProjectsView(AsyncViewMixin, ProjectsView):
+    pass
+
+
+class AsyncProjectDetailView(AsyncViewMixin, ProjectDetailView):
+    pass
+
+
+class AsyncAchievementsView(AsyncViewMixin, AchievementsView):
+    pass
+
+
+class AsyncAboutView(AsyncViewMixin, AboutView):
+    pass
+
+
+class SearchView(ListView, CommonContextMixin):
+    """Search the published projects, achievements and stories, e.g. `/search/?q=django&kind=project`."""
+    template_name = 'core/search.html'
+    context_object_name = 'results'
+    paginate_by = 10
+    max_query_length = 200
+
+    def get_query(self):
+        return self.request.GET.get('q', '').strip()[:self.max_query_length]
+
+    def get_kind(self):
+        kind = self.request.GET.get('kind')
+        return kind if kind in SearchDocument.Kind.values else None
+
+    def get_queryset(self):
+        return search(self.get_query(), self.get_kind())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['query'] = self.get_query()
+        context['kind'] = self.get_kind()
+        context['kinds'] = SearchDocument.Kind.choices
+        return context
 
-        # Only fetch published root stories
-        root_qs = Story.objects.filter(parent__isnull=True, is_published=True).order_by('-created_at')
 
-        # Prefetch only published children (direct substories) into `published_substories`
-        stories = root_qs.prefetch_related(
-            Prefetch(
-                'substories',
-                queryset=Story.objects.filter(is_published=True).order_by('created_at'),
-                to_attr='published_substories'
-            )
-        )
+# Sitemap, streamed from cached parts (see core.sitemaps)
+def sitemap(request):
+    """Serve the sitemap, or the sitemap index once the URLs no longer fit in a single file."""
+    files = sitemap_files()
+    if len(files) == 1:
+        content = stream_urlset(request, files[0])
+    else:
+        content = stream_index(request, len(files))
+    return StreamingHttpResponse(content, content_type='application/xml; charset=utf-8')
+
+
+def sitemap_section(request, number):
+    """Serve the file `number` of a sitemap split by the sitemap index."""
+    files = sitemap_files()
+    if not 1 <= number <= len(files) or len(files) == 1:
+        raise Http404("No such sitemap")
+    return StreamingHttpResponse(stream_urlset(request, files[number - 1]), content_type='application/xml; charset=utf-8')
+
+
+# Monitoring views
+def metrics(request):
+    """Expose the process metrics in the Prometheus text format, to staff users or with the METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not request.user.is_staff and not (token and constant_time_compare(authorization, f'Bearer {token}')):
+        return HttpResponse(status=403)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
-        context['stories'] = stories
-        return context
 
 # State views
 def handler404(request, exception):
@@ -43,6 +43,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.RequestNowMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django_browser_reload.middleware.BrowserReloadMiddleware',
@@ -90,6 +93,62 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Process-local by default; production can point it at a cache shared by all workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jolio',
+    },
+}
+
+SITE_CACHE_ALIAS = 'default'
+
+# A process-local cache is only invalidated in the worker that handled the admin write,
+# so cached values expire on their own after this many seconds (None to keep them until invalidated)
+AVAILABILITY_CACHE_TIMEOUT = 300
+
+# Rendered public pages, invalidated by `core.signals` when the rows they show change, and kept at most until
+# the first relative time they show, e.g. "Just now", changes
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Send the database, rendering and total time of every request in a Server-Timing header (see core.middleware)
+SERVER_TIMING = True
+
+# Bearer token allowing a Prometheus scraper to read /hq/metrics/ (staff users can always read it)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Background tasks (see core.tasks), run in a thread pool of each worker once the transaction commits
+TASKS_MAX_WORKERS = 2
+TASKS_ALWAYS_EAGER = False
+
+# Responsive image renditions (see core.images), generated on upload next to the original
+IMAGE_RENDITION_WIDTHS = (320, 640, 960, 1280, 1920)
+IMAGE_RENDITION_FORMATS = ('avif', 'webp')
+
+# Keyset pagination of the projects and achievements lists (see core.pagination), instead of page numbers
+CURSOR_PAGINATION = False
+
+# Serve the public pages with async views (see core.mixins.AsyncViewMixin), which read their context with
+# the async ORM, the independent reads at the same time; only worth it under ASGI,
+# e.g. `gunicorn jolio.asgi -k uvicorn_worker.UvicornWorker`
+ASYNC_VIEWS = False
+
+# Full-text search (see core.search): the PostgreSQL text search configuration of the documents
+SEARCH_CONFIG = 'english'
+
+# Read replicas (see core.routers): the aliases of DATABASES the public pages read from, the lag in seconds
+# past which a replica is left out, how often it is measured, and how long a client reads from the primary
+# after a write
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_DATABASES = []
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_INTERVAL = 10
+REPLICA_PIN_SECONDS = 10
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -23,6 +23,22 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 INSTALLED_APPS += ['django_browser_reload']
 
+# Report the duplicate (N+1), slow and lazily loaded queries of every request, with the template line or code
+# that ran them (see core.queries); QUERY_INSPECTOR_RAISE=True fails the request instead, e.g. in tests
+MIDDLEWARE += ['core.middleware.QueryInspectorMiddleware']
+QUERY_INSPECTOR = {
+    'SLOW_QUERY_MS': 100,
+    'DUPLICATE_THRESHOLD': 2,
+    'RAISE': os.getenv('QUERY_INSPECTOR_RAISE', False) == 'True',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'core.queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False}},
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -34,6 +50,10 @@ DATABASES = {
     'supabase': dj_database_url.parse(os.getenv('SUPABASE_POSTGRESQL_URL')),
 }
 
+# Cache
+# Templates change all the time in development, so don't serve stale pages
+PAGE_CACHE_ENABLED = False
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -1,9 +1,9 @@
 # Production settings for Jolio
-import dj_database_url
-
 from .base import *
 from dotenv import load_dotenv
 
+from core.database import database_config
+
 # Load prod env file
 load_dotenv(
     os.path.join(BASE_DIR, 'prod.env')
@@ -19,22 +19,74 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(" ") if os.getenv('ALLOWED_HOST
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are kept between requests, see core.database; with DB_POOL the threads of a worker share
+# a pool of them instead. Set DB_PGBOUNCER when the URL is the Supabase pooler in transaction mode (port 6543)
+CONNECTION_OPTIONS = {
+    'conn_max_age': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    'health_checks': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    'pool': os.getenv('DB_POOL', False) == 'True',
+    'pool_min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+    'pool_max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    'pgbouncer': os.getenv('DB_PGBOUNCER', False) == 'True',
+}
+
 DATABASES = {
     # Configure a database for your production environment
-    'default': dj_database_url.parse(os.getenv('SUPABASE_POSTGRESQL_URL')),
+    'default': database_config(os.getenv('SUPABASE_POSTGRESQL_URL'), **CONNECTION_OPTIONS),
 }
 
+# Read replicas, e.g. those of the Supabase project, separated by spaces in REPLICA_DATABASE_URLS
+REPLICA_DATABASES = []
+for index, url in enumerate(os.getenv('REPLICA_DATABASE_URLS', '').split(), start=1):
+    DATABASES[f'replica{index}'] = {**database_config(url, **CONNECTION_OPTIONS), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica{index}')
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+
+# Cache
+# Set CACHE_BACKEND/CACHE_LOCATION to share the cache between gunicorn workers, e.g.
+# django.core.cache.backends.redis.RedisCache with redis://host:6379/0
+if os.getenv('CACHE_BACKEND'):
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('CACHE_BACKEND'),
+            'LOCATION': os.getenv('CACHE_LOCATION', ''),
+            'KEY_PREFIX': 'jolio',
+        },
+    }
+    # A shared cache is invalidated for every worker at once
+    AVAILABILITY_CACHE_TIMEOUT = None
+
 SITE_URL = os.getenv('SITE_URL')
 SITE_NAME = os.getenv('SITE_NAME', 'Jolio')
 DEFAULT_META_DESCRIPTION = os.getenv('DEFAULT_META_DESCRIPTION', "Joel Fah's Personal Portfolio and Blog")
 
 CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS').split(" ")
 
+# Templates
+# Compiled templates are kept in memory by every worker, even when DEBUG is set to look into an issue
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Set with an ASGI server only: under WSGI every async view is run in an event loop of its own
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', False) == 'True'
+
 # Storage settings
 # Configure your storage settings for production
+# Static files are fingerprinted, precompressed and uploaded in parallel, see core.storage.
+# Set STATIC_CUSTOM_DOMAIN to the public URL of the bucket without its scheme, e.g.
+# <project>.supabase.co/storage/v1/object/public/<bucket>, to link them without a signature,
+# so that browsers and CDNs can keep them
+STATIC_CUSTOM_DOMAIN = os.environ.get("STATIC_CUSTOM_DOMAIN") or None
+
 STORAGES = {
     "staticfiles": {
-        "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        "BACKEND": "core.storage.StaticStorage",
         "OPTIONS": {
             "access_key": os.environ.get("SUPABASE_S3_ACCESS_KEY_ID"),
             "secret_key": os.environ.get("SUPABASE_S3_SECRET_ACCESS_KEY"),
@@ -42,6 +94,9 @@ STORAGES = {
             "region_name": os.environ.get("SUPABASE_S3_REGION_NAME"),
             "endpoint_url": os.environ.get("SUPABASE_S3_ENDPOINT_URL"),
             "location": "static",
+            "custom_domain": STATIC_CUSTOM_DOMAIN,
+            "querystring_auth": STATIC_CUSTOM_DOMAIN is None,
+            "workers": int(os.getenv("STATIC_UPLOAD_WORKERS", 8)),
         },
     },
     "default": {
@@ -19,7 +19,10 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 urlpatterns = [
+    path('hq/metrics/', metrics, name='metrics'),
     path('hq/', admin.site.urls),
     path("", include("core.urls", namespace="core")),
 ]